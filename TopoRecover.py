@@ -6,15 +6,34 @@
 #  ______/_/\/_____/_/\/___\\_\______/_/\/______
 # _______\_\/______\_\/_____|_|______\_\/______
 
+import glob
 import json
 import logging
+import os
+import queue
 import re
 import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 import click
 import shutil
+import breaker
 import config_reader
+import daemon
+import matchlist
+import metrics
 import parser
+import prescan
+import profiling
+import raw_archive
+import restore
+import scheduler
+import session_pool
+import snapshots
+import timing
 from confer import Confer
 
 logger = logging.getLogger(__name__)
@@ -26,6 +45,14 @@ DEFAULT_GENERAL_SETTINGS_FILE = Path("settings/general_settings.json")
 FALLBACK_READER_SETTINGS = Path("settings/reader_settings.json")
 
 RAW_OUTPUT_PATH = Path('raw_output')
+OUTPUT_PATH = Path('output')
+# raw output files may be compressed, see raw_archive
+RAW_CONFIG_FILE_PATTERN = re.compile(r"((\d{1,3}\.){3}\d{1,3})_(\d{4,5})-\d{4}(_\d{2}){2}-(\d{2}_){3}raw_config\.txt"
+                                     + "(" + "|".join(re.escape(suffix) for suffix in raw_archive.SUFFIXES) + ")?$")
+# maximum number of read devices waiting to be parsed, the reader waits if the parser falls behind
+PIPELINE_QUEUE_SIZE = 64
+# seconds between two saves of the snapshot index while the scheduler is running
+INDEX_SAVE_INTERVAL = 60
 
 
 def load_general_settings(path: Path = DEFAULT_GENERAL_SETTINGS_FILE) -> dict:
@@ -397,6 +424,31 @@ def generate_reader_settings_template(filename,
                 }
             }
         },
+        "limits": {
+            "max_connections_per_host": 8,
+            "connections_per_second": 2
+        },
+        "probe": {
+            "router": ["show running-config | include Last configuration change"],
+            "switch": ["show running-config | include Last configuration change",
+                       "show vtp status | include Configuration Revision"]
+        },
+        "schedule": {
+            "jitter": 0.1,
+            "device_types": {
+                "router": 3600,
+                "switch": 3600
+            },
+            "hosts": {}
+        },
+        "retry": {
+            "attempts": 3,
+            "backoff": 1,
+            "max_backoff": 30,
+            "failure_threshold": 3,
+            "open_seconds": 600,
+            "max_open_seconds": 86400
+        },
         "commands": {
             "router": {
                 "group1": ["", ""]
@@ -439,10 +491,11 @@ def generate_reader_settings_template(filename,
 
 
 def upload_configuration_to_devices(conf_file: str, device_type: str, ip: str, port: int, username: str = None,
-                                    password: str = None, secret: str = None) -> bool:
-    logger.info(f"UPLOAD_CONFIGURATION_START ip={ip} port={port} device_type={device_type} conf_file={conf_file}")
+                                    password: str = None, secret: str = None, batch_size: int = 1) -> bool:
+    logger.info(f"UPLOAD_CONFIGURATION_START ip={ip} port={port} device_type={device_type} conf_file={conf_file} "
+                f"batch_size={batch_size}")
     try:
-        confer = Confer(conf_file, device_type, ip, port, username, password, secret)
+        confer = Confer(conf_file, device_type, ip, port, username, password, secret, batch_size=batch_size)
         confer.send_cmds()
         logger.info(f"UPLOAD_CONFIGURATION_SUCCESS ip={ip} port={port}")
         return True
@@ -454,6 +507,242 @@ def upload_configuration_to_devices(conf_file: str, device_type: str, ip: str, p
         return False
 
 
+def parse_raw_output_file(raw_output_file: Path, output_dir: Path = None) -> bool:
+    """
+    Parses a raw output file into the output folder. Files with a name not matching the raw output format are ignored.
+    :param raw_output_file: raw output file written by the config reader
+    :param output_dir: directory the parsed configuration is written to, see parser.parse
+    :return: True if the file was parsed, False otherwise
+    """
+    # checks if the name is in correct format
+    matches = RAW_CONFIG_FILE_PATTERN.match(raw_output_file.name)
+    if matches is None:
+        return False
+    try:
+        parser.parse(raw_output_file, matches.group(1), matches.group(3), output_dir)
+    except Exception as e:
+        # the raw file is kept, so it can be parsed again later
+        logger.error(f"PARSE_ERROR file={raw_output_file} error={e}", exc_info=True)
+        return False
+    return True
+
+
+def parse_capture(capture: config_reader.DeviceCapture, index: snapshots.SnapshotIndex = None,
+                  compression: str = None) -> bool:
+    """
+    Parses the captured sections of a device directly into the output folder. If the capture can not be parsed, it is
+    written to the raw output folder (if not already done), so it can be parsed again later with --reparse.
+    :param capture: sections read by the config reader
+    :param index: if given, unchanged configurations are only recorded in the index instead of written again
+    :param compression: compression of the raw output file written for a capture that can not be parsed
+    :return: True if the capture was parsed, False otherwise
+    """
+    if capture.unchanged:
+        # the probe already showed that the latest configuration in the index is still up to date
+        index.mark_unchanged(capture.ip, capture.port)
+        return True
+    output_path = OUTPUT_PATH / re.sub("raw_", "", capture.file_name)
+    try:
+        parser.parse_lines(capture.lines(), output_path, capture.ip, capture.port, index)
+        if index is not None and capture.probe is not None:
+            index.set_probe(capture.ip, capture.port, capture.probe)
+    except Exception as e:
+        if capture.raw_file is None:
+            capture.write(RAW_OUTPUT_PATH, compression)
+        logger.error(f"PARSE_ERROR file={capture.raw_file} error={e}", exc_info=True)
+        return False
+    return True
+
+
+def parse_from_queue(captures: queue.Queue, index: snapshots.SnapshotIndex = None, compression: str = None,
+                     save_interval: float = None, run_metrics: metrics.RunMetrics = None) -> None:
+    """
+    Parses the captures of the read devices as they are put into the queue until None is received
+    :param captures: queue filled with DeviceCapture objects by the config reader
+    :param index: snapshot index passed to parse_capture
+    :param compression: raw output compression passed to parse_capture
+    :param save_interval: if given, the index (and the metrics) are saved after a parsed capture if they were not
+    saved for this many seconds, so a long-running reader does not lose the index on a crash
+    :param run_metrics: if given, the parse time of every capture is recorded in the metrics of its device
+    :return: None
+    """
+    last_save = time.monotonic()
+    while True:
+        capture = captures.get()
+        if capture is None:
+            return
+        # the queue is bounded, so the parser has to keep draining it whatever fails (e.g. a full disk while the
+        # configuration or the raw output file is written), otherwise the readers block on a full queue forever
+        try:
+            start = time.perf_counter()
+            parsed = parse_capture(capture, index, compression)
+            device_metrics = run_metrics.device(capture.ip, capture.port) if run_metrics is not None else None
+            if device_metrics is not None:
+                device_metrics.parse_seconds = round(time.perf_counter() - start, 4)
+                device_metrics.parsed = parsed
+            if save_interval is not None and time.monotonic() - last_save >= save_interval:
+                index.save()
+                if run_metrics is not None:
+                    run_metrics.write(OUTPUT_PATH)
+                last_save = time.monotonic()
+        except Exception as e:
+            logger.error(f"PARSER_ERROR ip={capture.ip} port={capture.port} error={e}", exc_info=True)
+
+
+def read_and_parse(script_setting_path: Path, workers: int, transport: str, keep_raw: bool = False,
+                   incremental: bool = True, probe: bool = False, compression: str = None,
+                   batch_read: bool = False, prescan_timeout: float = None, session_pool=None,
+                   profiler: profiling.PhaseProfiler = None) -> None:
+    """
+    Reads all devices and parses every device as soon as it is read. Reading and parsing run at the same time,
+    connected by a bounded queue. The captured sections are handed over in memory.
+    :param script_setting_path: path of the reader settings file
+    :param workers: number of devices that are read concurrently
+    :param transport: telnet transport used by the config reader
+    :param keep_raw: additionally archives the raw output of every device in the raw output folder
+    :param incremental: only writes the configurations that changed since the last run, see SnapshotIndex
+    :param probe: probes every device first and skips reading the devices whose probe output did not change
+    :param compression: compresses the raw output files while they are written, see raw_archive.COMPRESSIONS
+    :param batch_read: sends all commands of a device at once, see config_reader.ConfigReader
+    :param prescan_timeout: if given, only the devices accepting a TCP connection within this many seconds are read
+    :param session_pool: keeps the sessions to the devices open after reading, see session_pool.SessionPool
+    :param profiler: if given, reading and parsing are profiled as phases 'reader' and 'parser'. They run one after
+    the other then, the captures are kept in memory until all devices are read.
+    :return: None
+    """
+    index = snapshots.SnapshotIndex(OUTPUT_PATH, force_write=not incremental)
+    index.load()
+    timings = timing.TimingStore(OUTPUT_PATH)
+    timings.load()
+    breakers = breaker.CircuitBreaker(OUTPUT_PATH)
+    breakers.load()
+    run_metrics = metrics.RunMetrics()
+    captures = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE if profiler is None else 0)
+    parser_thread = threading.Thread(target=parse_from_queue, args=(captures, index, compression, None, run_metrics),
+                                     name="parser")
+    if profiler is None:
+        parser_thread.start()
+    try:
+        with profiling.phase(profiler, "reader"):
+            config_reader.ConfigReader(RAW_OUTPUT_PATH, script_setting_path, workers, transport, captures,
+                                       keep_raw, index if probe else None, compression, session_pool, timings,
+                                       batch_read, breakers, prescan_timeout, run_metrics).execute()
+    finally:
+        # None tells the parser that no more captures will follow
+        captures.put(None)
+        if profiler is None:
+            parser_thread.join()
+        else:
+            with profiler.phase("parser"):
+                parse_from_queue(captures, index, compression, None, run_metrics)
+        index.save()
+        timings.save()
+        breakers.save()
+        run_metrics.write(OUTPUT_PATH)
+
+
+def run_scheduled_daemon(script_setting_path: Path, workers: int, keep_raw: bool = False, incremental: bool = True,
+                         probe: bool = False, compression: str = None, interval: float = 3600, keepalive: float = 60,
+                         control_port: int = 9099, batch_read: bool = False) -> None:
+    """
+    Runs the daemon with the built-in scheduler: every device is read at its own interval (see the schedule section
+    of the reader settings) and parsed as soon as it is read. At most `workers` devices are read at the same time.
+    :param script_setting_path: path of the reader settings file
+    :param workers: maximum number of devices read at the same time
+    :param keep_raw: additionally archives the raw output of every device in the raw output folder
+    :param incremental: only writes the configurations that changed since the last run, see SnapshotIndex
+    :param probe: probes every device first and skips reading the devices whose probe output did not change
+    :param compression: compresses the raw output files while they are written, see raw_archive.COMPRESSIONS
+    :param interval: seconds between two reads of a device without a configured interval
+    :param keepalive: seconds a session may be idle before a keepalive is sent
+    :param control_port: port of the daemon control channel on localhost
+    :param batch_read: sends all commands of a device at once, see config_reader.ConfigReader
+    :return: None
+    """
+    index = snapshots.SnapshotIndex(OUTPUT_PATH, force_write=not incremental)
+    index.load()
+    timings = timing.TimingStore(OUTPUT_PATH)
+    timings.load()
+    breakers = breaker.CircuitBreaker(OUTPUT_PATH)
+    breakers.load()
+    run_metrics = metrics.RunMetrics()
+    captures = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    parser_thread = threading.Thread(target=parse_from_queue,
+                                     args=(captures, index, compression, INDEX_SAVE_INTERVAL, run_metrics),
+                                     name="parser")
+    parser_thread.start()
+    pool = session_pool.SessionPool(keepalive)
+    try:
+        reader = config_reader.ConfigReader(RAW_OUTPUT_PATH, script_setting_path, workers, "netmiko", captures,
+                                            keep_raw, index if probe else None, compression, pool, timings,
+                                            batch_read, breakers, None, run_metrics)
+        reader.read_settings()
+        schedule = reader.schedule
+        collection_scheduler = scheduler.CollectionScheduler(
+            reader.read_device, scheduler.device_intervals(reader.devices, schedule, interval), workers,
+            schedule.get("jitter", scheduler.DEFAULT_JITTER))
+        daemon.Daemon(None, interval, keepalive, control_port, collection_scheduler, pool).run()
+    finally:
+        # None tells the parser that no more captures will follow
+        captures.put(None)
+        parser_thread.join()
+        index.save()
+        timings.save()
+        breakers.save()
+        run_metrics.write(OUTPUT_PATH)
+
+
+def find_raw_output_files(source: str) -> list[Path]:
+    """
+    Lists the raw output files in a directory or matching a glob pattern, sorted by name
+    :param source: directory containing raw output files or a glob pattern, e.g. 'archive/*/*_raw_config.txt*'
+    :return: paths of all files with a name matching the raw output format, compressed or not
+    """
+    source_path = Path(source)
+    if source_path.is_dir():
+        files = source_path.glob("*_raw_config.txt*")
+    else:
+        files = (Path(p) for p in glob.glob(source, recursive=True))
+    return sorted(f for f in files if f.is_file() and RAW_CONFIG_FILE_PATTERN.match(f.name))
+
+
+def reparse_raw_output_files(raw_output_files: list[Path], jobs: int,
+                             profiler: profiling.PhaseProfiler = None) -> dict:
+    """
+    Parses already read raw output files again, spread over a pool of processes. The raw output files are kept and
+    the parsed configurations are written to the output folder.
+    :param raw_output_files: raw output files to parse
+    :param jobs: number of parser processes
+    :param profiler: if given, the files are parsed in this process instead of the pool and profiled as phase 'parser'
+    :return: dict with the number of parsed and failed files, the parsed bytes and the needed seconds
+    """
+    total_bytes = sum(f.stat().st_size for f in raw_output_files)
+    logger.info(f"REPARSE_START files={len(raw_output_files)} bytes={total_bytes} jobs={jobs}")
+    start = time.perf_counter()
+    # a few files per task keep the inter process overhead low without starving processes at the end
+    chunksize = max(1, len(raw_output_files) // (jobs * 4))
+    # loaded before the pool starts, so forked processes share the compiled matchlist, others load it once
+    matchlist.load_matchlist()
+    if profiler is not None:
+        # the profiler only sees this process
+        with profiler.phase("parser"):
+            results = [parse_raw_output_file(f, OUTPUT_PATH) for f in raw_output_files]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=matchlist.load_matchlist) as pool:
+            results = list(pool.map(partial(parse_raw_output_file, output_dir=OUTPUT_PATH), raw_output_files,
+                                    chunksize=chunksize))
+    seconds = time.perf_counter() - start
+    stats = {
+        "parsed": results.count(True),
+        "failed": results.count(False),
+        "bytes": total_bytes,
+        "seconds": seconds
+    }
+    logger.info(f"REPARSE_FINISHED parsed={stats['parsed']} failed={stats['failed']} bytes={total_bytes} "
+                f"seconds={seconds:.3f}")
+    return stats
+
+
 @click.command()
 @click.option('--edit-settings', is_flag=True, help='Edit the settings file interactively.')
 @click.option('--settings-path', metavar='FILENAME', help='Change path to use different settings file.')
@@ -462,7 +751,49 @@ def upload_configuration_to_devices(conf_file: str, device_type: str, ip: str, p
 @click.option('--version', is_flag=True, help='Show program version and exit.')
 @click.option('--clear-output', is_flag=True,
               help='Delete all files in output/ & raw_output/ folders.')
-def main(edit_settings, settings_path, generate_template, upload_config, version, clear_output):
+@click.option('--workers', default=1, show_default=True, type=click.IntRange(min=1),
+              help='Number of devices that are read concurrently.')
+@click.option('--transport', default='netmiko', show_default=True, type=click.Choice(config_reader.TRANSPORTS),
+              help='Telnet transport used to read the devices.')
+@click.option('--reparse', metavar='DIR_OR_GLOB',
+              help='Parse already read raw output files again without connecting to devices, keeps the raw files.')
+@click.option('--jobs', default=os.cpu_count() or 1, show_default=True, type=click.IntRange(min=1),
+              help='Number of parser processes used by --reparse.')
+@click.option('--keep-raw', is_flag=True, help='Keep the raw output of every read device in raw_output/.')
+@click.option('--full', is_flag=True, help='Write the configuration of every device, even if it did not change.')
+@click.option('--probe', is_flag=True,
+              help='Probe every device first and only read the devices that changed since the last run.')
+@click.option('--compress', type=click.Choice(list(raw_archive.COMPRESSIONS)),
+              help='Compress the raw output files in raw_output/ while they are written.')
+@click.option('--daemon', 'run_daemon', is_flag=True,
+              help='Keep running, collect all devices every --interval seconds and keep the sessions open.')
+@click.option('--interval', default=3600, show_default=True, type=click.FloatRange(min=1),
+              help='Seconds between two collections of the daemon, default interval of a device with --schedule.')
+@click.option('--keepalive', default=60, show_default=True, type=click.FloatRange(min=1),
+              help='Seconds an idle daemon session may stay silent before a keepalive is sent.')
+@click.option('--control-port', default=9099, show_default=True, type=click.IntRange(1, 65535),
+              help='Port of the daemon control channel on localhost.')
+@click.option('--control', type=click.Choice(daemon.CONTROL_COMMANDS),
+              help='Send a command to the running daemon and exit.')
+@click.option('--schedule', is_flag=True,
+              help='Run the daemon with the built-in scheduler, every device is read at its own interval.')
+@click.option('--batch-size', default=1, show_default=True, type=click.IntRange(min=1),
+              help='Number of lines --upload-config sends at once without waiting for the prompt after every line.')
+@click.option('--restore', 'restore_topology', is_flag=True,
+              help='Upload the latest configuration in output/ to every device of the inventory.')
+@click.option('--batch-read', is_flag=True,
+              help='Send all show commands of a device at once instead of waiting for the prompt after every command.')
+@click.option('--prescan', 'run_prescan', is_flag=True,
+              help='Check which devices accept a TCP connection first and only read the reachable ones.')
+@click.option('--prescan-timeout', default=prescan.DEFAULT_TIMEOUT, show_default=True,
+              type=click.FloatRange(min=0, min_open=True),
+              help='Seconds a device has to accept the connection of --prescan.')
+@click.option('--profile', is_flag=True,
+              help='Profile the reader, parser and upload phases and write the stats to logs/profiles/.')
+def main(edit_settings, settings_path, generate_template, upload_config, version, clear_output, workers, transport,
+         reparse, jobs, keep_raw, full, probe, compress, run_daemon, interval, keepalive, control_port, control,
+         schedule, batch_size, restore_topology, batch_read, run_prescan, prescan_timeout,
+         profile):
     """
     This program runs the TopoRecovery tool, which retrieves configurations from network devices,
     parses them and stores the read config. Logs are stored in the logs/log.txt file.
@@ -472,6 +803,7 @@ def main(edit_settings, settings_path, generate_template, upload_config, version
     The Options will only do their specific task and then exit the program.
 
     """
+    profiler = profiling.PhaseProfiler() if profile else None
     try:
         # ensure logs directory and `logs/log.txt` exist and are usable
         logs_dir = Path("logs")
@@ -570,12 +902,26 @@ def main(edit_settings, settings_path, generate_template, upload_config, version
                 click.echo("Invalid secret. Try again")
             logger.info(
                 f"UPLOAD_CONFIGURATION_INPUTS conf_file={conf_file} device_ios={device_ios} ip={ip} port={port} username={username}")
-            success = upload_configuration_to_devices(conf_file, device_ios, ip, port, username, password, secret)
+            with profiling.phase(profiler, "upload"):
+                success = upload_configuration_to_devices(conf_file, device_ios, ip, port, username, password,
+                                                          secret, batch_size)
             if success:
                 click.echo("Configuration uploaded successfully.")
             else:
                 click.echo("Failed to upload configuration.")
             sys.exit(0)
+        # handles the restore option, the non-interactive upload of the whole topology
+        if restore_topology:
+            logger.info(f"RESTORE_REQUESTED workers={workers} batch_size={batch_size}")
+            reader = config_reader.ConfigReader(RAW_OUTPUT_PATH, Path(script_setting_path), keep_raw=False)
+            reader.read_settings()
+            with profiling.phase(profiler, "upload"):
+                stats = restore.restore_topology(reader.devices, OUTPUT_PATH, workers, batch_size, reader.limiter)
+            click.echo(f"Restored {stats['restored']} of {stats['devices']} devices in {stats['seconds']:.2f}s, "
+                       f"{stats['failed_commands']} commands failed")
+            if stats["failed"]:
+                click.echo(f"{stats['failed']} devices could not be restored, see logs/log.txt")
+            sys.exit(0 if stats["failed"] == 0 and stats["failed_commands"] == 0 else 1)
         # handle the clear-output option
         if clear_output:
             logger.info("CLEAR_OUTPUT_REQUESTED")
@@ -590,20 +936,54 @@ def main(edit_settings, settings_path, generate_template, upload_config, version
             click.echo("Cleared output/ and raw_output/ folders.")
             logger.info("OUTPUT_FOLDERS_CLEARED")
             exit(0)
+        # handle the reparse option
+        if reparse:
+            logger.info(f"REPARSE_REQUESTED source={reparse} jobs={jobs}")
+            raw_output_files = find_raw_output_files(reparse)
+            if not raw_output_files:
+                click.echo(f"No raw output files found in {reparse}")
+                sys.exit(1)
+            stats = reparse_raw_output_files(raw_output_files, jobs, profiler)
+            megabytes = stats["bytes"] / 1_000_000
+            seconds = max(stats["seconds"], 1e-9)
+            processes = jobs if profiler is None else 1
+            click.echo(f"Parsed {stats['parsed']} files ({megabytes:.2f} MB) in {stats['seconds']:.2f}s with "
+                       f"{processes} processes: {stats['parsed'] / seconds:.1f} files/s, "
+                       f"{megabytes / seconds:.2f} MB/s")
+            if stats["failed"]:
+                click.echo(f"{stats['failed']} files could not be parsed, see logs/log.txt")
+            sys.exit(0 if stats["failed"] == 0 else 1)
+
+        # handle the daemon control option
+        if control:
+            logger.info(f"DAEMON_CONTROL_REQUESTED command={control} port={control_port}")
+            click.echo(daemon.send_control_command(control, control_port))
+            sys.exit(0)
+        # handle the daemon option, the scheduler always runs inside the daemon
+        if run_daemon or schedule:
+            if transport != "netmiko":
+                click.echo("The daemon only supports the netmiko transport.")
+                sys.exit(1)
+            if schedule:
+                logger.info(f"SCHEDULER_REQUESTED interval={interval} workers={workers} keepalive={keepalive} "
+                            f"control_port={control_port}")
+                click.echo(f"Scheduler running, control it with --control on port {control_port}")
+                run_scheduled_daemon(script_setting_path, workers, keep_raw, not full, probe, compress, interval,
+                                     keepalive, control_port, batch_read)
+                sys.exit(0)
+            logger.info(f"DAEMON_REQUESTED interval={interval} keepalive={keepalive} control_port={control_port}")
+            click.echo(f"Daemon running, control it with --control on port {control_port}")
+            # the daemon passes its session pool as last argument of read_and_parse
+            collect = partial(read_and_parse, script_setting_path, workers, transport, keep_raw, not full, probe,
+                              compress, batch_read, prescan_timeout if run_prescan else None)
+            daemon.Daemon(collect, interval, keepalive, control_port).run()
+            sys.exit(0)
 
         # if the program reaches this point, it executes the config_reader and parser
-        config_reader.ConfigReader(RAW_OUTPUT_PATH, script_setting_path).execute()
-
-        for raw_output_file in RAW_OUTPUT_PATH.glob("*_raw_config.txt"):
-            # checks if the name is in correct format
-            file_name = raw_output_file.name
-            p = re.compile(r"((\d{1,3}\.){3}\d{1,3})_(\d{4,5})-\d{4}(_\d{2}){2}-(\d{2}_){3}raw_config\.txt")
-            matches = p.match(file_name)
-            if matches is None:
-                continue
-            # parses raw_config file and deletes it afterward
-            parser.parse(raw_output_file, matches.group(1), matches.group(3))
-            raw_output_file.unlink()
+        logger.info(f"CONFIG_READER_START workers={workers} transport={transport} keep_raw={keep_raw} full={full} "
+                    f"probe={probe} compress={compress} batch_read={batch_read} prescan={run_prescan}")
+        read_and_parse(script_setting_path, workers, transport, keep_raw, not full, probe, compress, batch_read,
+                       prescan_timeout if run_prescan else None, profiler=profiler)
 
     except KeyboardInterrupt:
         logger.warning("PROGRAM_INTERRUPTED_BY_USER")
@@ -613,6 +993,10 @@ def main(edit_settings, settings_path, generate_template, upload_config, version
         logger.error(f"UNHANDLED_EXCEPTION error={e}", exc_info=True)
         click.echo(f"An unexpected error occurred: {e}")
         sys.exit(1)
+    finally:
+        # the options exit the program with sys.exit(), so the summary is written here for all of them
+        if profiler is not None and profiler.phases:
+            click.echo(profiler.write())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,414 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import asyncio
+import codecs
+import re
+import time
+from multiprocessing import AuthenticationError
+from typing import Tuple, List
+
+import connector
+from connector import ExecMode
+from metrics import DeviceMetrics
+from timing import TimingProfile
+
+# telnet protocol bytes (RFC 854)
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+# options the client lets the device enable, every other option is refused
+OPTION_ECHO = 1
+OPTION_SUPPRESS_GO_AHEAD = 3
+
+PROMPT_PATTERN = r"[\w.\-@/:]+(\([\w.\-]+\))?[>#]\s*$"
+LOGIN_PATTERN = re.compile(r"(?P<username>(user ?name|login)\s*:\s*$)|(?P<password>password\s*:\s*$)|"
+                           r"(?P<prompt>" + PROMPT_PATTERN + ")", flags=re.I)
+LOGIN_FAILED_PATTERN = re.compile(r"% (Login invalid|Authentication failed|Bad passwords)", flags=re.I)
+ENABLE_PATTERN = re.compile(r"(?P<password>password\s*:\s*$)|(?P<prompt>" + PROMPT_PATTERN + ")", flags=re.I)
+# how far back an already searched buffer is searched again, patterns must not be longer than this
+SEARCH_OVERLAP = 512
+
+
+class AsyncConnector(connector.Connector):
+    """
+    Connector that drives the telnet session with asyncio streams instead of a blocking netmiko ConnectHandler.
+    It offers the same methods as Connector, but as coroutines, so one event loop can handle thousands of sessions
+    without a thread per session. The current exec mode is tracked as in Connector, but taken from the prompts that
+    are read anyway.
+    """
+
+    def __init__(self, device_type: str, ip: str, port: int, username: str = None, password: str = None,
+                 secret: str = None, timeout: float = 10, timing: TimingProfile = None,
+                 metrics: DeviceMetrics = None):
+        """
+        :param timeout: seconds to wait for the device while connecting and logging in
+        :param timing: measured timing of the device, see Connector
+        :param metrics: if given, the duration and size of every answer is recorded in it
+        """
+        super().__init__(device_type, ip, port, username, password, secret, timing, metrics)
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._decoder = None
+        self._buffer = ""
+        self._searched = 0
+        self._telnet_state = None
+        self._prompt = None
+
+    def __str__(self) -> str:
+        return f"{self.device_type} (asyncio) -> {self.ip}:{self.port}"
+
+    @property
+    def prompt(self) -> str | None:
+        return self._prompt
+
+    async def connect(self) -> bool:
+        """
+        Opens the telnet connection, logs in if the device asks for credentials and disables paging
+        :returns: True if connection established successfully
+        :raise ConnectionError: if a connection is already established or a socket error occurs
+        :raise TimeoutError: if the device is not reachable or does not answer
+        :raise AuthenticationError: if authentication fails
+        """
+        if self._conn is not None:
+            raise ConnectionError(
+                f'CONNECTION_ERROR: cannot establish multiple connections to one device, at {self.ip}:{self.port}')
+        try:
+            self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(self.ip, self.port),
+                                                                self.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError('TIMEOUT_ERROR: device not reachable (Layer 8?)')
+        except OSError as e:
+            raise ConnectionError(f'TIMEOUT_ERROR: {e}')
+        self._conn = self._writer
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+        self._searched = 0
+        self._telnet_state = None
+        try:
+            await self._login()
+            await self.send_command_with_response("terminal length 0")
+            await self.send_command_with_response("terminal width 511")
+            return True
+        except Exception:
+            await self.disconnect()
+            raise
+
+    async def disconnect(self) -> None:
+        """
+        Closes the telnet connection to the device, does nothing if no connection is established
+        :return: is None
+        """
+        if self._writer is None:
+            return
+        writer = self._writer
+        self._reader = self._writer = self._conn = None
+        self._forget_mode()
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except Exception:
+            # the session is dropped anyway, a failing close must not hide the actual result
+            pass
+
+    async def _login(self) -> None:
+        """
+        Wakes up the console and answers username and password prompts until an exec prompt is shown
+        :raise AuthenticationError: if the device rejects the credentials or asks for missing ones
+        :raise TimeoutError: if the device does not show a prompt
+        """
+        self._write("\r\n")
+        wake_ups = 1
+        while True:
+            try:
+                data, match = await self._read_until(LOGIN_PATTERN, self.timeout)
+            except asyncio.TimeoutError:
+                # consoles that were idle may need more than one return to show the prompt
+                if wake_ups >= 3:
+                    raise TimeoutError('TIMEOUT_ERROR: device not reachable (Layer 8?)')
+                wake_ups += 1
+                self._write("\r\n")
+                continue
+            if LOGIN_FAILED_PATTERN.search(data):
+                raise AuthenticationError(f'AUTHENTICATION_ERROR: login rejected by {self.ip}:{self.port}')
+            if match.group("username"):
+                if "username" not in self._device:
+                    raise AuthenticationError('AUTHENTICATION_ERROR: device asks for a username, none is set')
+                self._write(self._device["username"] + "\n")
+            elif match.group("password"):
+                if "password" not in self._device:
+                    raise AuthenticationError('AUTHENTICATION_ERROR: device asks for a password, none is set')
+                self._write(self._device["password"] + "\n")
+            else:
+                self._set_prompt(match.group("prompt"))
+                return
+
+    def _write(self, text: str) -> None:
+        # a literal 0xFF has to be doubled so the device does not read it as telnet command
+        self._writer.write(text.encode("utf-8").replace(b"\xff", b"\xff\xff"))
+
+    def _feed(self, data: bytes) -> None:
+        """
+        Removes telnet negotiation from the received bytes, answers it and appends the text to the buffer
+        :param data: bytes as received from the socket
+        """
+        if IAC not in data and self._telnet_state is None:
+            text = data
+        else:
+            text = bytearray()
+            for byte in data:
+                state = self._telnet_state
+                if state is None:
+                    if byte == IAC:
+                        self._telnet_state = IAC
+                    else:
+                        text.append(byte)
+                elif state == IAC:
+                    if byte == IAC:
+                        text.append(byte)
+                        self._telnet_state = None
+                    elif byte in (DO, DONT, WILL, WONT):
+                        self._telnet_state = byte
+                    elif byte == SB:
+                        self._telnet_state = SB
+                    else:
+                        self._telnet_state = None
+                elif state in (DO, DONT, WILL, WONT):
+                    self._negotiate(state, byte)
+                    self._telnet_state = None
+                elif state == SB:
+                    # subnegotiation is skipped until IAC SE
+                    if byte == IAC:
+                        self._telnet_state = SE
+                else:
+                    self._telnet_state = None if byte == SE else SB
+        decoded = self._decoder.decode(bytes(text))
+        self._buffer += decoded.replace("\r\n", "\n").replace("\r", "").replace("\x00", "")
+
+    def _negotiate(self, command: int, option: int) -> None:
+        # DONT and WONT need no answer, the option is disabled on both sides by default
+        if command == DO:
+            answer = WILL if option == OPTION_SUPPRESS_GO_AHEAD else WONT
+        elif command == WILL:
+            answer = DO if option in (OPTION_ECHO, OPTION_SUPPRESS_GO_AHEAD) else DONT
+        else:
+            return
+        self._writer.write(bytes([IAC, answer, option]))
+
+    async def _read_until(self, pattern: re.Pattern, timeout: float) -> Tuple[str, re.Match]:
+        """
+        Reads from the device until the pattern is found in the received text
+        :param pattern: compiled pattern to search for
+        :param timeout: seconds to wait for the pattern
+        :return: (text up to the end of the match, match) the rest stays in the buffer
+        :raise asyncio.TimeoutError: if the pattern is not found in time
+        :raise ConnectionError: if the device closes the connection
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            # only the new part of the buffer is searched, large outputs are not searched over and over again
+            match = pattern.search(self._buffer, max(0, self._searched - SEARCH_OVERLAP))
+            if match is not None:
+                data = self._buffer[:match.end()]
+                self._buffer = self._buffer[match.end():]
+                self._searched = 0
+                return data, match
+            self._searched = len(self._buffer)
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            data = await asyncio.wait_for(self._reader.read(65536), remaining)
+            if not data:
+                raise ConnectionError(f'CONNECTION_ERROR: connection closed by {self.ip}:{self.port}')
+            self._feed(data)
+
+    def _forget_mode(self) -> None:
+        super()._forget_mode()
+        self._prompt = None
+
+    def _set_prompt(self, prompt: str) -> None:
+        super()._set_prompt(prompt)
+        self._prompt = prompt.strip()
+
+    def _base_prompt(self) -> str:
+        return re.sub(r"(\([\w.\-]+\))?[>#]$", "", self._prompt) if self._prompt else ""
+
+    async def find_prompt(self) -> str:
+        """
+        Sends an empty line and returns the prompt of the device
+        :return: the current prompt, e.g. 'R1#'
+        """
+        if self._conn is None:
+            raise RuntimeError("RUNTIME_ERROR: no current running connection, call connect() to establish connection")
+        self._write("\n")
+        data, match = await self._read_until(re.compile(PROMPT_PATTERN), self.timeout)
+        self._set_prompt(match.group(0))
+        return self._prompt
+
+    async def send_command_with_response(self, command: str, expected_str: str = None, read_timeout: int = 10) -> \
+            Tuple[bool, str]:
+        """
+        Sends a command to the connected device and returns a tuple indicating success and the output
+        :param command: is the command string to send to the device
+        :param expected_str: is the expected string to be found at the end of the output, default is the prompt
+        :param read_timeout: how long the code waits for a response before an exception is raised time in seconds
+        :return: (success: bool, output: str)
+        :raise TimeoutError: if expected_str is not found in time
+        """
+        if self._conn is None:
+            raise RuntimeError("RUNTIME_ERROR: no current running connection, call connect() to establish connection")
+        pattern = re.compile(expected_str if expected_str is not None else PROMPT_PATTERN)
+        cmd = command.strip()
+        if self.timing is not None:
+            read_timeout = self.timing.read_timeout(cmd, read_timeout)
+        start = time.perf_counter()
+        self._write(cmd + "\n")
+        try:
+            # the echo of the command is read first, so the pattern is not found in the echo itself
+            if cmd:
+                await self._read_until(re.compile(re.escape(cmd)), read_timeout)
+            data, _ = await self._read_until(pattern, read_timeout)
+        except asyncio.TimeoutError:
+            # the mode of the device is unknown after a command without answer
+            self._forget_mode()
+            raise TimeoutError(f"TIMEOUT_ERROR: pattern '{pattern.pattern}' not found after {read_timeout}s "
+                               f"for command '{cmd}' at {self.ip}:{self.port}")
+        output = data[1:] if data.startswith("\n") else data
+        seconds = time.perf_counter() - start
+        if self.timing is not None:
+            self.timing.record(cmd, seconds, len(output))
+        if self.metrics is not None:
+            self.metrics.record_command(cmd, seconds, len(output))
+        # the last line is the new prompt, it is stored for the exec mode and removed from the output
+        lines = output.split("\n")
+        prompt_match = re.fullmatch(PROMPT_PATTERN, lines[-1].strip())
+        if prompt_match is not None:
+            self._set_prompt(prompt_match.group(0))
+            if self._base_prompt() and self._base_prompt() in lines[-1]:
+                output = "\n".join(lines[:-1])
+        else:
+            # the pattern matched somewhere else, the mode is derived from the command as with netmiko
+            self._prompt = None
+            self._track_mode(cmd, expected_str)
+        if "% Invalid input detected at '^' marker." in output:
+            return False, command
+        return True, output
+
+    async def send_show_batch(self, commands: List[str], read_timeout: float = 10) -> List[Tuple[bool, str]]:
+        """
+        Same as connector.Connector.send_show_batch()
+        :param commands: show commands to send, the device must be in privileged exec mode
+        :param read_timeout: how long the code waits for the answer of one command
+        :return: (success, output) of every command, see connector.split_show_batch()
+        :raise TimeoutError: if the marker of the last command is not found in time
+        """
+        if self._conn is None:
+            raise RuntimeError("RUNTIME_ERROR: no current running connection, call connect() to establish connection")
+        if not commands:
+            return []
+        if self.timing is not None:
+            read_timeout = sum(self.timing.read_timeout(command, read_timeout) for command in commands)
+        else:
+            read_timeout = read_timeout * len(commands)
+        marker = connector.SHOW_BATCH_MARKER.format(len(commands) - 1)
+        pattern = re.compile(re.escape(marker) + r"\s*\n[^\n]*[>#]")
+        start = time.perf_counter()
+        self._write("\n".join(connector.show_batch_lines(commands)) + "\n")
+        try:
+            data, _ = await self._read_until(pattern, read_timeout)
+        except asyncio.TimeoutError:
+            self._forget_mode()
+            raise TimeoutError(f"TIMEOUT_ERROR: pattern '{pattern.pattern}' not found after {read_timeout}s "
+                               f"for a batch of {len(commands)} commands at {self.ip}:{self.port}")
+        self._set_prompt(data.rstrip().split("\n")[-1])
+        if self.metrics is not None:
+            self.metrics.record_command("; ".join(command.strip() for command in commands),
+                                        time.perf_counter() - start, len(data))
+        return connector.split_show_batch(commands, data)
+
+    async def was_command_send_successfully(self, command: str, expected_str: str = None) -> bool:
+        """
+        Sends a command to the connected device and returns True if the command was accepted by the device
+        :param command: is the command string to send to the device
+        :param expected_str: is the expected string to be found at the end of the output
+        :return: is a boolean indicating if the command was accepted
+        """
+        return (await self.send_command_with_response(command, expected_str))[0]
+
+    async def send_command_list(self, commands: List[str]) -> str:
+        """
+        Sends a list of commands to the connected device and returns the combined output as a string
+        :param commands: is a list of command strings to send to the device
+        :return: is a string containing the combined output of all commands
+        :raise RuntimeError: if any command fails
+        """
+        output = ""
+        for comm in commands:
+            response = await self.send_command_with_response(comm)
+            if not response[0]:
+                raise RuntimeError(f"RUNTIME_ERROR: command failed: \n{comm}\n{response[1]}")
+            output += response[1] + "\n"
+        return output
+
+    async def get_exec_mode(self) -> ExecMode:
+        """
+        Same as Connector.get_exec_mode(), the device is only asked for its prompt if the mode is unknown
+        :return: is an ExecMode enumeration value containing the current execution mode
+        :raise RuntimeError: if no connection is established
+        """
+        if self._conn is None:
+            raise RuntimeError("RUNTIME_ERROR: unable to determine exec mode, no connection established")
+        if self._mode is None:
+            await self.find_prompt()
+        return self._mode
+
+    async def go_to_priv_exec_mode(self) -> None:
+        """
+        From any mode goes into the privileged execution mode.
+        :return:
+        :raise RuntimeError: if the device asks for a secret and none is set or the secret is wrong
+        """
+        current_mode = await self.get_exec_mode()
+        if current_mode == ExecMode.PRIVILEGED_EXEC:
+            return
+        if current_mode == ExecMode.GLOBAL_EXEC:
+            await self.send_command_with_response("end", expected_str=".+#")
+            return
+        self._write("enable\n")
+        try:
+            data, match = await self._read_until(ENABLE_PATTERN, self.timeout)
+            if match.group("password"):
+                if "secret" not in self._device:
+                    raise RuntimeError("RUNTIME_ERROR: unable to enter privileged execution mode due to missing "
+                                       "'secret' parameter in settings file")
+                self._write(self._device["secret"] + "\n")
+                data, match = await self._read_until(ENABLE_PATTERN, self.timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError("RUNTIME_ERROR: unable to enter privileged execution mode, no prompt received")
+        if match.group("password") or not match.group("prompt").strip().endswith("#"):
+            raise RuntimeError("RUNTIME_ERROR: unable to enter privileged execution mode, 'secret' was rejected")
+        self._set_prompt(match.group("prompt"))
+
+    async def go_to_glob_exec_mode(self) -> None:
+        """
+        Same as Connector.go_to_glob_exec_mode(): a configuration sub mode is left, nothing is sent if the device is
+        already in the Global execution mode
+        :return:
+        """
+        if self._in_config_mode() is None:
+            await self.find_prompt()
+        if self._in_config_mode():
+            return
+        await self.go_to_priv_exec_mode()
+        await self.send_command_with_response("configure terminal", expected_str=connector.CONFIG_PROMPT_PATTERN)
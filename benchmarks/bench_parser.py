@@ -0,0 +1,196 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import click
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+# the benchmarks are run from a checkout, the modules of the tool are one folder up
+sys.path.insert(0, str(REPO_DIR))
+
+import parser  # noqa: E402
+from generate_config import generate_raw  # noqa: E402
+
+# name, interfaces, vlans
+SCENARIOS = [
+    ("tiny", 10, 10),
+    ("access", 48, 100),
+    ("stack", 480, 500),
+    ("distribution", 2000, 1000),
+    ("core", 10000, 4000),
+]
+# a change of a time or the peak memory by more than this is marked in the comparison with the last run
+THRESHOLD_PERCENT = 10
+
+
+def _median_seconds(function, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _peak_memory(function) -> int:
+    """
+    :return: peak of the memory allocated by the function in bytes, measured in a separate run since tracemalloc slows
+    down the code it traces
+    """
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_scenario(name: str, interfaces: int, vlans: int, repeat: int, work_dir: Path) -> dict:
+    """
+    Generates the raw output file of the scenario and measures parser.parse on the file and parser.extract_groups on
+    its cleaned running-config
+    :param repeat: runs per measurement, the median is taken
+    :param work_dir: folder for the raw output file and the parsed configuration
+    :return: the results of the scenario
+    """
+    raw = generate_raw(interfaces, vlans)
+    raw_path = work_dir / f"{name}_raw_config.txt"
+    with open(raw_path, "w", encoding="utf-8") as f:
+        f.write(raw)
+    size = raw_path.stat().st_size
+    lines = raw.count("\n")
+    output_dir = work_dir / "output"
+
+    def parse():
+        parser.parse(raw_path, "10.0.0.1", 22, output_dir)
+
+    with open(raw_path, "r", encoding="utf-8") as f:
+        running = parser.RawConfig(f).running
+
+    def extract():
+        parser.extract_groups(running)
+
+    # the first run compiles the matchlist and warms up the caches
+    parse()
+    parse_seconds = _median_seconds(parse, repeat)
+    extract_seconds = _median_seconds(extract, repeat)
+    return {
+        "interfaces": interfaces,
+        "vlans": vlans,
+        "bytes": size,
+        "lines": lines,
+        "parse_seconds": round(parse_seconds, 6),
+        "parse_mb_per_second": round(size / 1_000_000 / parse_seconds, 3),
+        "parse_lines_per_second": round(lines / parse_seconds),
+        "parse_peak_bytes": _peak_memory(parse),
+        "extract_groups_seconds": round(extract_seconds, 6),
+        "extract_groups_peak_bytes": _peak_memory(extract),
+    }
+
+
+def latest_results() -> tuple[Path, dict] | tuple[None, None]:
+    """
+    :return: path and content of the newest results file, (None, None) if there is none
+    """
+    files = sorted(RESULTS_DIR.glob("parser_*.json"))
+    if not files:
+        return None, None
+    with open(files[-1], "r", encoding="utf-8") as f:
+        return files[-1], json.load(f)
+
+
+def _change(new: float, old: float) -> str:
+    if not old:
+        return "n/a"
+    percent = 100 * (new - old) / old
+    # less time and less memory are better
+    if percent > THRESHOLD_PERCENT:
+        return f"{percent:+6.1f}%  <-- regression"
+    if percent < -THRESHOLD_PERCENT:
+        return f"{percent:+6.1f}%  <-- improvement"
+    return f"{percent:+6.1f}%"
+
+
+def compare(new: dict, old: dict) -> str:
+    """
+    :param new: results of this run
+    :param old: results of an earlier run
+    :return: the change of the times and peak memory of every scenario that is in both runs
+    """
+    lines = []
+    for name, result in new["scenarios"].items():
+        previous = old.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        lines.append(f"{name}:")
+        for key in ["parse_seconds", "parse_peak_bytes", "extract_groups_seconds", "extract_groups_peak_bytes"]:
+            if key in previous:
+                lines.append(f"  {key:<26} {previous[key]:>14} -> {result[key]:>14}  "
+                             f"{_change(result[key], previous[key])}")
+    return "\n".join(lines)
+
+
+@click.command()
+@click.option('--scenario', 'names', multiple=True, type=click.Choice([s[0] for s in SCENARIOS]),
+              help='Run only this scenario, can be given more than once. By default all scenarios are run.')
+@click.option('--repeat', default=5, show_default=True, type=click.IntRange(min=1),
+              help='Runs per measurement, the median is reported.')
+@click.option('--no-save', is_flag=True, help='Do not store the results in benchmarks/results.')
+def main(names, repeat, no_save):
+    """
+    Measures the throughput and the peak memory of the parser on synthetic switch configurations from 10 to 10000
+    interfaces and compares them with the last saved run
+    """
+    # the matchlist is loaded relative to the working directory
+    os.chdir(REPO_DIR)
+    scenarios = [s for s in SCENARIOS if not names or s[0] in names]
+    results = {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "scenarios": {}
+    }
+    click.echo(f"{'scenario':<13}{'interfaces':>11}{'vlans':>7}{'MB':>8}{'parse s':>10}{'MB/s':>8}"
+               f"{'lines/s':>11}{'peak MB':>9}{'groups s':>10}{'peak MB':>9}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, interfaces, vlans in scenarios:
+            result = run_scenario(name, interfaces, vlans, repeat, Path(work_dir))
+            results["scenarios"][name] = result
+            click.echo(f"{name:<13}{interfaces:>11}{vlans:>7}{result['bytes'] / 1_000_000:>8.2f}"
+                       f"{result['parse_seconds']:>10.4f}{result['parse_mb_per_second']:>8.2f}"
+                       f"{result['parse_lines_per_second']:>11}{result['parse_peak_bytes'] / 1_000_000:>9.2f}"
+                       f"{result['extract_groups_seconds']:>10.4f}"
+                       f"{result['extract_groups_peak_bytes'] / 1_000_000:>9.2f}")
+
+    previous_path, previous = latest_results()
+    if previous is not None:
+        click.echo(f"\nCompared with {previous_path.name}:")
+        click.echo(compare(results, previous) or "no common scenarios")
+    if not no_save:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_DIR / f"parser_{datetime.now().strftime('%Y_%m_%d-%H_%M_%S')}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        click.echo(f"\nResults saved to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import random
+import sys
+from pathlib import Path
+
+import click
+
+# the benchmarks are run from a checkout, the modules of the tool are one folder up
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config_reader import format_section  # noqa: E402
+
+PORTS_PER_MODULE = 48
+# every n-th port is a trunk, every n-th access port is shut down
+TRUNK_EVERY = 24
+SHUTDOWN_EVERY = 7
+# vlans with a routed interface and number of access lists
+SVI_EVERY = 10
+ACCESS_LISTS = 20
+
+
+def interface_name(index: int) -> str:
+    """
+    :param index: number of the port, starting with 0
+    :return: name of the port on a stack with 48 ports per member, e.g. GigabitEthernet2/0/5
+    """
+    return f"GigabitEthernet{index // PORTS_PER_MODULE + 1}/0/{index % PORTS_PER_MODULE + 1}"
+
+
+def vlan_ids(vlans: int) -> list[int]:
+    """
+    :param vlans: number of vlans besides vlan 1
+    :return: the vlan ids, normal vlans (2-1001) first, then extended vlans from 1006 on
+    """
+    normal = list(range(2, min(vlans, 1000) + 2))
+    extended = list(range(1006, 1006 + max(0, vlans - 1000)))
+    return normal + extended
+
+
+def running_config(interfaces: int, vlans: list[int], rng: random.Random) -> str:
+    """
+    :return: output of 'show running-config' of a switch with the given ports and vlans
+    """
+    lines = ["Building configuration...", "", "Current configuration : {size} bytes", "!",
+             "! Last configuration change at 10:00:00 UTC Mon Jan 5 2026", "!", "version 15.2",
+             "service timestamps debug datetime msec", "service timestamps log datetime msec",
+             "no service password-encryption", "service compress-config", "!", "hostname SW1", "!",
+             "boot-start-marker", "boot-end-marker", "!", "enable secret 5 $1$mERr$hx5rVt7rPNoS4wqbXKX7m0", "!",
+             "username cisco privilege 15 password 0 cisco", "no aaa new-model", "!", "ip cef", "no ipv6 cef", "!",
+             "spanning-tree mode rapid-pvst", "spanning-tree extend system-id", "!",
+             "vlan internal allocation policy ascending", "!"]
+    for index in range(interfaces):
+        lines.append(f"interface {interface_name(index)}")
+        if index % TRUNK_EVERY == 0:
+            lines += [" description uplink", " switchport trunk allowed vlan all",
+                      " switchport trunk encapsulation dot1q", " switchport mode trunk"]
+        else:
+            vlan = rng.choice(vlans) if vlans else 1
+            lines += [f" description access port {index}", f" switchport access vlan {vlan}",
+                      " switchport mode access", " spanning-tree portfast edge"]
+            if index % SHUTDOWN_EVERY == 0:
+                lines.append(" shutdown")
+        lines += [" media-type rj45", " negotiation auto", "!"]
+    lines += ["interface Vlan1", " no ip address", " shutdown", "!"]
+    for vlan in vlans[::SVI_EVERY]:
+        lines += [f"interface Vlan{vlan}", f" ip address 10.{vlan // 256}.{vlan % 256}.1 255.255.255.0", "!"]
+    lines += ["router ospf 1", " router-id 10.255.255.1", " passive-interface default"]
+    lines += [f" network 10.{vlan // 256}.{vlan % 256}.0 0.0.0.255 area 0" for vlan in vlans[::SVI_EVERY]]
+    lines += ["!", "ip forward-protocol nd", "!", "no ip http server", "no ip http secure-server", "!"]
+    for acl in range(ACCESS_LISTS):
+        lines.append(f"ip access-list extended ACL_{acl}")
+        lines += [f" permit tcp 10.{acl}.{rule}.0 0.0.0.255 any eq {rng.choice([22, 80, 443, 8080])}"
+                  for rule in range(10)]
+        lines += [" deny   ip any any log", "!"]
+    lines += ["control-plane", "!", "banner motd ^C", "Authorized access only", "^C", "!",
+              "line con 0", " exec-timeout 0 0", " privilege level 15", " logging synchronous", " stopbits 1",
+              "line aux 0", " stopbits 1", "line vty 0 4", " login local", " transport input telnet ssh", "!",
+              "end"]
+    text = "\n".join(lines) + "\n"
+    return text.replace("{size}", str(len(text)), 1)
+
+
+def vlan_brief(interfaces: int, vlans: list[int]) -> str:
+    """
+    :return: output of 'show vlan brief', the ports are only listed for vlan 1
+    """
+    lines = ["", "VLAN Name                             Status    Ports",
+             "---- -------------------------------- --------- -------------------------------"]
+    ports = [interface_name(index).replace("GigabitEthernet", "Gi") for index in range(min(interfaces, 12))]
+    lines.append(f"{1:<4} {'default':<32} {'active':<9} {', '.join(ports[:4])}")
+    for start in range(4, len(ports), 4):
+        lines.append(f"{'':<48}{', '.join(ports[start:start + 4])}")
+    defaults = [(1002, "fddi-default"), (1003, "token-ring-default"), (1004, "fddinet-default"),
+                (1005, "trnet-default")]
+    rows = [(vlan, f"VLAN{vlan:04d}", "active") for vlan in vlans if vlan < 1002]
+    rows += [(vlan, name, "act/unsup") for vlan, name in defaults]
+    rows += [(vlan, f"VLAN{vlan:04d}", "active") for vlan in vlans if vlan > 1005]
+    lines += [f"{vlan:<4} {name:<32} {status:<9} " for vlan, name, status in rows]
+    return "\n".join(lines) + "\n"
+
+
+def vtp_status(vlans: list[int]) -> str:
+    """
+    :return: output of 'show vtp status' and 'show vtp password'
+    """
+    return ("VTP Version capable             : 1 to 3\n"
+            "VTP version running             : 2\n"
+            "VTP Domain Name                 : BENCH\n"
+            "VTP Pruning Mode                : Disabled\n"
+            "VTP Traps Generation            : Disabled\n"
+            "Device ID                       : 0c11.2233.4400\n"
+            "Configuration last modified by 10.255.255.1 at 1-5-26 10:00:00\n"
+            "Local updater ID is 10.0.0.1 on interface Vl10 (lowest numbered VLAN interface found)\n"
+            "\n"
+            "Feature VLAN:\n"
+            "--------------\n"
+            "VTP Operating Mode                : Server\n"
+            "Maximum VLANs supported locally   : 1005\n"
+            f"Number of existing VLANs          : {len(vlans) + 5}\n"
+            "Configuration Revision            : 42\n"
+            "MD5 digest                        : 0x5E 0x1A 0x2B 0x3C 0x4D 0x5E 0x6F 0x70\n"
+            "VTP Password: bench\n")
+
+
+def interface_brief(interfaces: int, vlans: list[int]) -> str:
+    """
+    :return: output of 'show ip interface brief' with a row for every port and routed vlan
+    """
+    lines = [f"{'Interface':<23}{'IP-Address':<16}OK? Method Status                Protocol"]
+    for index in range(interfaces):
+        if index % TRUNK_EVERY != 0 and index % SHUTDOWN_EVERY == 0:
+            status, protocol = "administratively down", "down"
+        else:
+            status, protocol = ("up", "up") if index % 3 else ("down", "down")
+        lines.append(f"{interface_name(index):<23}{'unassigned':<16}YES unset  {status:<22}{protocol:<8}")
+    lines.append(f"{'Vlan1':<23}{'unassigned':<16}YES NVRAM  {'administratively down':<22}{'down':<8}")
+    for vlan in vlans[::SVI_EVERY]:
+        address = f"10.{vlan // 256}.{vlan % 256}.1"
+        lines.append(f"{f'Vlan{vlan}':<23}{address:<16}YES NVRAM  {'up':<22}{'up':<8}")
+    return "\n".join(lines) + "\n"
+
+
+def generate_raw(interfaces: int, vlans: int, seed: int = 0) -> str:
+    """
+    Generates the raw output of a switch in the layout the config reader writes (see config_reader.format_section
+    and ConfigReader._add_section): the answers of a section without the prompt of the device, each ending with a
+    line break.
+    :param interfaces: number of switch ports
+    :param vlans: number of vlans besides vlan 1, up to 1000 normal vlans, the others are extended vlans
+    :param seed: seed of the vlan assignment of the ports and the access lists
+    :return: content of a raw output file
+    """
+    rng = random.Random(seed)
+    ids = vlan_ids(vlans)
+    sections = [("running", running_config(interfaces, ids, rng)), ("vlan", vlan_brief(interfaces, ids)),
+                ("vtp", vtp_status(ids)), ("interface", interface_brief(interfaces, ids))]
+    raw = ""
+    for section, output in sections:
+        raw += format_section(section, output)
+    return raw
+
+
+@click.command()
+@click.option('--interfaces', default=48, show_default=True, type=click.IntRange(min=1),
+              help='Number of switch ports.')
+@click.option('--vlans', default=100, show_default=True, type=click.IntRange(0, 4000),
+              help='Number of vlans besides vlan 1.')
+@click.option('--seed', default=0, show_default=True, type=int, help='Seed of the random parts of the config.')
+@click.option('--output', metavar='FILENAME', help='Write to this file instead of printing the raw output.')
+def main(interfaces, vlans, seed, output):
+    """
+    Generates the raw output file of a synthetic Cisco IOS switch
+    """
+    raw = generate_raw(interfaces, vlans, seed)
+    if output is None:
+        click.echo(raw, nl=False)
+        return
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(raw)
+    click.echo(f"Wrote {output}: {interfaces} interfaces, {vlans} vlans, {len(raw.encode()) / 1_000_000:.2f} MB")
+
+
+if __name__ == '__main__':
+    main()
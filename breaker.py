@@ -0,0 +1,189 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import json
+import logging
+import os
+import random
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+BREAKER_FILE_NAME = "breaker.json"
+# defaults of the optional 'retry' section of reader_settings.json
+DEFAULT_ATTEMPTS = 3
+DEFAULT_BACKOFF = 1
+DEFAULT_MAX_BACKOFF = 30
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_OPEN_SECONDS = 600
+DEFAULT_MAX_OPEN_SECONDS = 86400
+SETTINGS_KEYS = ["attempts", "backoff", "max_backoff", "failure_threshold", "open_seconds", "max_open_seconds"]
+
+
+class RetryPolicy:
+    """
+    How often a device is tried again within one read and when its circuit breaker opens. A failed attempt is
+    repeated after an exponential backoff, a device that failed failure_threshold reads in a row is not read again for
+    open_seconds. Every failed read after that doubles the time, up to max_open_seconds.
+    """
+
+    def __init__(self, attempts: int = DEFAULT_ATTEMPTS, backoff: float = DEFAULT_BACKOFF,
+                 max_backoff: float = DEFAULT_MAX_BACKOFF, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 open_seconds: float = DEFAULT_OPEN_SECONDS, max_open_seconds: float = DEFAULT_MAX_OPEN_SECONDS) -> None:
+        """
+        :param attempts: attempts of one read, 1 for no retry
+        :param backoff: seconds waited before the second attempt, doubled for every further attempt
+        :param max_backoff: maximum seconds waited between two attempts
+        :param failure_threshold: failed reads in a row that open the circuit breaker of a device
+        :param open_seconds: seconds a device is skipped once its circuit breaker opened
+        :param max_open_seconds: maximum seconds a device is skipped
+        :raise ValueError: if a value is not a positive number
+        """
+        for name, value in [("attempts", attempts), ("failure_threshold", failure_threshold)]:
+            if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+                raise ValueError(f"VALUE_ERROR: '{name}' must be a positive integer -> currently: {value}")
+        for name, value in [("backoff", backoff), ("max_backoff", max_backoff), ("open_seconds", open_seconds),
+                            ("max_open_seconds", max_open_seconds)]:
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or value <= 0:
+                raise ValueError(f"VALUE_ERROR: '{name}' must be a positive number -> currently: {value}")
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+
+    def __repr__(self) -> str:
+        return (f"RetryPolicy(attempts={self.attempts}, backoff={self.backoff}, max_backoff={self.max_backoff}, "
+                f"failure_threshold={self.failure_threshold}, open_seconds={self.open_seconds}, "
+                f"max_open_seconds={self.max_open_seconds})")
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "RetryPolicy":
+        """
+        :param settings: the optional 'retry' section of reader_settings.json, missing keys use the defaults
+        :return: the policy
+        """
+        return cls(**{key: settings[key] for key in SETTINGS_KEYS if key in settings})
+
+    def delay(self, attempt: int) -> float:
+        """
+        :param attempt: number of the failed attempt, starting with 1
+        :return: seconds to wait before the next attempt. The backoff is randomly shortened by up to half, so devices
+        failing at the same time (e.g. after a reload of the host) do not retry at the same time.
+        """
+        return min(self.max_backoff, self.backoff * 2 ** (attempt - 1)) * random.uniform(0.5, 1)
+
+    def open_duration(self, trips: int) -> float:
+        """
+        :param trips: how often the circuit breaker opened without a successful read in between, starting with 1
+        :return: seconds the device is skipped
+        """
+        return min(self.max_open_seconds, self.open_seconds * 2 ** (trips - 1))
+
+
+class CircuitBreaker:
+    """
+    Failed reads of every device, stored as breaker.json in the output folder, so a dead device is also skipped in
+    the next runs instead of costing its whole timeout every time. Once the open time of a device is over, the device
+    is read once more: a successful read closes the breaker, a failed one opens it again for twice as long.
+    """
+
+    def __init__(self, output_dir: Path) -> None:
+        """
+        :param output_dir: folder the state file is stored in
+        """
+        self._output_dir = Path(output_dir)
+        self._path = self._output_dir / BREAKER_FILE_NAME
+        self._lock = threading.Lock()
+        self._devices = {}
+
+    def __repr__(self) -> str:
+        return f"CircuitBreaker({self._path}, failing={len(self._devices)})"
+
+    def load(self) -> None:
+        """
+        Loads the state of the last run, a missing or broken file is treated as empty
+        :return: None
+        """
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, dict) or not all(isinstance(state, dict) for state in data.values()):
+                raise TypeError(f"TYPE_ERROR: breaker state must be of type dict. Current: {type(data)}")
+            self._devices = data
+        except FileNotFoundError:
+            self._devices = {}
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.warning(f"WARNING_BREAKER_INVALID path={self._path} error={e}")
+            self._devices = {}
+
+    def allow(self, ip: str, port: str) -> bool:
+        """
+        :return: False while the circuit breaker of the device is open
+        """
+        with self._lock:
+            state = self._devices.get(f"{ip}:{port}")
+            if state is None or state.get("open_until") is None:
+                return True
+            try:
+                open_until = datetime.fromisoformat(state["open_until"])
+            except (TypeError, ValueError):
+                return True
+        if datetime.now() < open_until:
+            logger.warning(f"CIRCUIT_OPEN_SKIPPED ip={ip} port={port} until={state['open_until']} "
+                           f"failures={state.get('failures')}")
+            return False
+        logger.info(f"CIRCUIT_HALF_OPEN ip={ip} port={port} failures={state.get('failures')}")
+        return True
+
+    def record_success(self, ip: str, port: str) -> None:
+        """
+        Closes the circuit breaker of a device that was read
+        :return: None
+        """
+        with self._lock:
+            state = self._devices.pop(f"{ip}:{port}", None)
+        if state is not None and state.get("trips"):
+            logger.info(f"CIRCUIT_CLOSED ip={ip} port={port}")
+
+    def record_failure(self, ip: str, port: str, policy: RetryPolicy, error: Exception) -> None:
+        """
+        Counts a failed read of a device and opens its circuit breaker once policy.failure_threshold reads in a row
+        failed
+        :param policy: thresholds and open times
+        :param error: error of the last attempt
+        :return: None
+        """
+        with self._lock:
+            state = self._devices.setdefault(f"{ip}:{port}", {"failures": 0, "trips": 0})
+            state["failures"] = state.get("failures", 0) + 1
+            state["last_error"] = str(error)
+            state["last_failure"] = datetime.now().isoformat(timespec="seconds")
+            if state["failures"] < policy.failure_threshold:
+                return
+            state["trips"] = state.get("trips", 0) + 1
+            duration = policy.open_duration(state["trips"])
+            state["open_until"] = (datetime.now() + timedelta(seconds=duration)).isoformat(timespec="seconds")
+        logger.warning(f"CIRCUIT_OPENED ip={ip} port={port} failures={state['failures']} seconds={duration:g}")
+
+    def save(self) -> None:
+        """
+        Writes the state, the old file is only replaced once the new one is completely written
+        :return: None
+        """
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_name(self._path.name + ".tmp")
+        with self._lock:
+            data = {key: dict(state) for key, state in self._devices.items()}
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self._path)
+        logger.info(f"BREAKER_SAVED path={self._path} failing={len(data)}")
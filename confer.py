@@ -7,11 +7,53 @@
 # _______\_\/______\_\/_____|_|______\_\/______
 
 import logging
+import re
 
 import connector
+from limiter import ConnectionLimiter
+from timing import TimingProfile
 
 logger = logging.getLogger(__name__)
 
+INVALID_INPUT = "% Invalid input detected at '^' marker."
+# a configuration prompt followed by the echo of the command processed at this prompt
+PROMPT_ECHO_PATTERN = re.compile(r"^\S*" + connector.CONFIG_PROMPT_PATTERN + r"(.*)$")
+# seconds a batch may take at least and additionally per command
+BATCH_READ_TIMEOUT = 10
+BATCH_READ_TIMEOUT_PER_COMMAND = 2
+
+
+def find_failed_commands(commands: list[str], output: str) -> tuple[list[int], int]:
+    """
+    Finds the commands of a batch that failed with '% Invalid input'. The device echoes every command after its
+    prompt and prints the error below the echo, so an error belongs to the last echoed command before it.
+    The echoes are matched with the commands in order, commands without an echo (e.g. the lines of a banner) are
+    skipped.
+    :param commands: commands of the batch in the order they were sent
+    :param output: output of the batch, see connector.Connector.send_config_batch
+    :return: indexes of the failed commands and the number of errors that could not be assigned to a command
+    """
+    failed = []
+    unassigned = 0
+    position = 0
+    current = None
+    for line in output.replace("\r", "").split("\n"):
+        match = PROMPT_ECHO_PATTERN.match(line)
+        if match:
+            echo = match.group(1).strip()
+            current = None
+            for index in range(position, len(commands)):
+                if commands[index].strip() == echo:
+                    current, position = index, index + 1
+                    break
+            continue
+        if INVALID_INPUT in line:
+            if current is None:
+                unassigned += 1
+            elif current not in failed:
+                failed.append(current)
+    return failed, unassigned
+
 
 class Confer:
     """
@@ -26,16 +68,18 @@ class Confer:
     Attributes:
     cmds (list of str): List of commands read from the configuration file.
     conn (connector.Connector): Connection object initialized with provided device information.
+    limiter (limiter.ConnectionLimiter): Limits the sessions opened to the host of the device.
 
     Methods:
     __init__(conf_file: str, device_type: str, ip: str, port: int, username: str = None,
     password: str = None): Initializes the object with configuration and device connection
     setup.
-    send_cmds(): Connects to the device and sends commands sequentially.
+    send_cmds(): Connects to the device and sends commands sequentially, in batches if batch_size is greater than 1.
     """
 
     def __init__(self, conf_file: str, device_type: str, ip: str, port: int, username: str = None,
-                 password: str = None, secret: str = None):
+                 password: str = None, secret: str = None, limiter: ConnectionLimiter = None, batch_size: int = 1,
+                 timing: TimingProfile = None):
         """
         Initialize the class with necessary configuration for connecting to a device
         and loading command configurations.
@@ -47,27 +91,78 @@ class Confer:
         :param username: Username for authentication (optional)
         :param password: Password for authentication (optional)
         :param secret: Secret for Privileged Exec Mode authentication (optional)
+        :param limiter: Connection limiter shared with other uploads to the same host (optional)
+        :param batch_size: Number of commands sent at once without waiting for the prompt after every command,
+        1 waits for the prompt after every command
+        :param timing: Measured timing of the device, see connector.Connector (optional)
         """
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError(f"VALUE_ERROR: batch_size must be a positive integer -> currently: {batch_size}")
+        self.batch_size = batch_size
         self.cmds = []
         with open(conf_file, "r", encoding="utf-8") as f:
             self.cmds = f.readlines()
-        self.conn = connector.Connector(device_type, ip, port, username, password, secret)
+        self.conn = connector.Connector(device_type, ip, port, username, password, secret, timing)
+        self.limiter = limiter if limiter is not None else ConnectionLimiter()
 
-    def send_cmds(self):
+    def send_cmds(self) -> list[tuple[int, str]]:
         """
         Executes a series of commands by establishing a connection and sending
         each command sequentially. If a command execution fails, logs a warning and prints it to the terminal.
-        :return: None
+        With a batch_size greater than 1, the commands are streamed in batches and the failed commands are found in
+        the output of the batch afterward.
+        :return: line number in the configuration file and command of every failed command
         """
-        self.conn.connect()
-        self.conn.go_to_glob_exec_mode()
-        self.conn.send_command_with_response("no logging console", expected_str=r"\(config[^\)]*\)#")
-        for cmd in self.cmds:
-            r = self.conn.send_command_with_response(cmd, expected_str=r"\(config[^\)]*\)#")
-            if not r[0]:
-                logger.warning(f"WARNING_COMMAND_FAILED_WHILE_UPLOADING: {r[1]}")
-                colorRed = "\033[31m"
-                colorReset = "\033[0m"
-                print(f"{colorRed}WARNING_COMMAND_FAILED_WHILE_UPLOADING: {r[1]}{colorReset}")
-        self.conn.go_to_glob_exec_mode()
-        self.conn.send_command_with_response("logging console", expected_str=r"\(config[^\)]*\)#")
+        with self.limiter.session(self.conn.ip):
+            try:
+                self.conn.connect()
+                self.conn.go_to_glob_exec_mode()
+                self.conn.send_command_with_response("no logging console",
+                                                     expected_str=connector.CONFIG_PROMPT_PATTERN)
+                if self.batch_size == 1:
+                    failed = []
+                    for index, cmd in enumerate(self.cmds):
+                        r = self.conn.send_command_with_response(cmd,
+                                                                 expected_str=connector.CONFIG_PROMPT_PATTERN)
+                        if not r[0]:
+                            failed.append((index + 1, cmd.strip()))
+                            self._report_failed(index + 1, cmd)
+                else:
+                    failed = self._send_batches()
+                self.conn.go_to_glob_exec_mode()
+                self.conn.send_command_with_response("logging console",
+                                                     expected_str=connector.CONFIG_PROMPT_PATTERN)
+            finally:
+                self.conn.disconnect()
+        return failed
+
+    def _send_batches(self) -> list[tuple[int, str]]:
+        """
+        Sends the commands in batches of batch_size commands
+        :return: line number in the configuration file and command of every failed command
+        """
+        failed = []
+        for start in range(0, len(self.cmds), self.batch_size):
+            batch = self.cmds[start:start + self.batch_size]
+            output = self.conn.send_config_batch(
+                batch, f"! TOPORECOVER_BATCH_{start // self.batch_size}",
+                BATCH_READ_TIMEOUT + BATCH_READ_TIMEOUT_PER_COMMAND * len(batch))
+            indexes, unassigned = find_failed_commands(batch, output)
+            for index in indexes:
+                failed.append((start + index + 1, batch[index].strip()))
+                self._report_failed(start + index + 1, batch[index])
+            if unassigned:
+                # the error is still reported, only the exact line is unknown
+                logger.warning(f"WARNING_COMMAND_FAILED_WHILE_UPLOADING: {unassigned} failed command(s) in lines "
+                               f"{start + 1}-{start + len(batch)}, output:\n{output}")
+                print(f"\033[31mWARNING_COMMAND_FAILED_WHILE_UPLOADING: {unassigned} failed command(s) in lines "
+                      f"{start + 1}-{start + len(batch)}\033[0m")
+        logger.info(f"UPLOAD_BATCHES_SENT commands={len(self.cmds)} batch_size={self.batch_size} failed={len(failed)}")
+        return failed
+
+    @staticmethod
+    def _report_failed(line_number: int, cmd: str) -> None:
+        logger.warning(f"WARNING_COMMAND_FAILED_WHILE_UPLOADING: line {line_number}: {cmd.strip()}")
+        colorRed = "\033[31m"
+        colorReset = "\033[0m"
+        print(f"{colorRed}WARNING_COMMAND_FAILED_WHILE_UPLOADING: line {line_number}: {cmd.strip()}{colorReset}")
@@ -6,15 +6,111 @@
 #  ______/_/\/_____/_/\/___\\_\______/_/\/______
 # _______\_\/______\_\/_____|_|______\_\/______
 
+import asyncio
+import io
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import connector
+import prescan
+import raw_archive
+import scheduler
+from async_connector import AsyncConnector
+from breaker import CircuitBreaker, RetryPolicy
 import json
 import logging
 from datetime import datetime
+from limiter import ConnectionLimiter
+from metrics import DeviceMetrics, RunMetrics
+from session_pool import SessionPool
+from timing import TimingProfile, TimingStore
 
 logger = logging.getLogger(__name__)
 
+TRANSPORTS = ["netmiko", "asyncio"]
+# commands that show if a device changed without reading its whole configuration, can be overwritten per device type
+# by the optional 'probe' section of reader_settings.json
+DEFAULT_PROBE_COMMANDS = {
+    "router": ["show running-config | include Last configuration change"],
+    "switch": ["show running-config | include Last configuration change",
+               "show vtp status | include Configuration Revision"]
+}
+
+
+def format_section(section: str, config: str) -> str:
+    """
+    :param section: name of the section, e.g. 'running'
+    :param config: responses of all commands of the section
+    :return: the section as it is written to a raw output file
+    """
+    return f"** start {section} **\n{config}\n** end {section} **\n"
+
+
+def is_positive_number(value) -> bool:
+    """
+    :param value: value read from reader_settings.json
+    :return: True if the value is an int or float greater than 0 (True and False are no numbers here)
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+
+class DeviceCapture:
+    """
+    The sections read from one device. The capture is kept in memory and handed to the parser directly, writing it
+    to a raw output file is optional.
+    """
+
+    def __init__(self, ip: str, port: str, file_name: str) -> None:
+        """
+        :param ip: IP address of the device
+        :param port: port of the device
+        :param file_name: name of the raw output file of the device, also used for the parsed configuration
+        """
+        self.ip = ip
+        self.port = port
+        self.file_name = file_name
+        self.sections = []
+        # path of the raw output file if the capture was written to one
+        self.raw_file = None
+        # output of the probe commands, None if the device was not probed
+        self.probe = None
+        # True if the probe showed that the device did not change, the capture has no sections then
+        self.unchanged = False
+
+    def __repr__(self) -> str:
+        return f"DeviceCapture({self.ip}:{self.port}, sections={[section for section, _ in self.sections]})"
+
+    def add_section(self, section: str, config: str) -> None:
+        self.sections.append((section, config))
+
+    def text(self) -> str:
+        """
+        :return: the capture in the format of a raw output file
+        """
+        return "".join(format_section(section, config) for section, config in self.sections)
+
+    def lines(self):
+        """
+        :return: iterator over the lines exactly as they are read from the raw output file of the capture
+        """
+        # newline=None translates line breaks the same way reading the file in text mode does
+        return io.StringIO(self.text(), newline=None)
+
+    def write(self, dest_path: Path, compression: str = None) -> Path:
+        """
+        Writes the whole capture to a raw output file in the given directory
+        :param dest_path: directory of the raw output file
+        :param compression: compression of the file, see raw_archive.COMPRESSIONS, None for a plain text file
+        :return: path of the written file
+        """
+        dest_path.mkdir(parents=True, exist_ok=True)
+        self.raw_file = dest_path.joinpath(raw_archive.archive_name(self.file_name, compression))
+        with raw_archive.open_text(self.raw_file, "w") as dest:
+            dest.write(self.text())
+        return self.raw_file
+
 
 class ConfigReader:
     """
@@ -23,13 +119,67 @@ class ConfigReader:
     """
 
     def __init__(self, dest_path: Path = Path("./raw_output"), setting_path: Path = Path(
-        "settings/reader_settings.json")) -> None:
-        dest_path.mkdir(exist_ok=True)
+        "settings/reader_settings.json"), workers: int = 1, transport: str = "netmiko",
+                 result_queue: queue.Queue = None, keep_raw: bool = True, probe_index=None,
+                 compression: str = None, session_pool: SessionPool = None, timing: TimingStore = None,
+                 batch_read: bool = False, breaker: CircuitBreaker = None, prescan_timeout: float = None,
+                 metrics: RunMetrics = None) -> None:
+        """
+        :param dest_path: directory the raw output files are written to
+        :param setting_path: path to the reader_settings.json file
+        :param workers: number of devices that are read at the same time, 1 reads the devices one after another
+        :param transport: 'netmiko' uses a thread per worker, 'asyncio' reads all devices in one event loop
+        :param result_queue: if given, the DeviceCapture of every read device is put into this queue as soon as the
+        device is read, so the captures can be parsed while other devices are still being read
+        :param keep_raw: writes every section to a raw output file in dest_path while it is read, if False the
+        sections are only kept in memory
+        :param probe_index: if given, every device is probed first and only read completely if the probe output
+        differs from the one returned by probe_index.probe(ip, port), e.g. a snapshots.SnapshotIndex
+        :param compression: compresses the raw output files while they are written, see raw_archive.COMPRESSIONS
+        :param session_pool: if given, the sessions to the devices are taken from the pool and kept open after the
+        devices are read, only supported by the netmiko transport
+        :param timing: if given, the timeouts of every device are set from its measured timing and the timing is
+        measured again while the device is read
+        :param batch_read: sends all commands of a device at once and splits the answer locally, instead of waiting
+        for the prompt after every command
+        :param breaker: if given, devices that failed too often in a row are skipped for a while, see
+        breaker.CircuitBreaker
+        :param prescan_timeout: if given, connect_to_devices() first checks which devices accept a TCP connection
+        within this many seconds and only reads those, see prescan.scan
+        :param metrics: if given, the durations and sizes measured while the devices are read are recorded in it
+        """
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError(f"VALUE_ERROR: workers must be a positive integer -> currently: {workers}")
+        if transport not in TRANSPORTS:
+            raise ValueError(f"VALUE_ERROR: transport must be one of {TRANSPORTS} -> currently: {transport}")
+        if compression is not None and compression not in raw_archive.COMPRESSIONS:
+            raise ValueError(f"VALUE_ERROR: compression must be one of {list(raw_archive.COMPRESSIONS)} "
+                             f"-> currently: {compression}")
+        if session_pool is not None and transport != "netmiko":
+            raise ValueError(f"VALUE_ERROR: a session pool is only supported by the netmiko transport "
+                             f"-> currently: {transport}")
+        if keep_raw:
+            dest_path.mkdir(exist_ok=True)
+        self._keep_raw = keep_raw
+        self._compression = compression
+        self._session_pool = session_pool
+        self._timing = timing
+        self._batch_read = batch_read
+        self._breaker = breaker
+        self._prescan_timeout = prescan_timeout
+        self._metrics = metrics
         self._dest_path = dest_path
         self._setting_path = setting_path
         self._commands = None
         self._devices = None
-        self._dest_path = dest_path
+        self._workers = workers
+        self._transport = transport
+        self._result_queue = result_queue
+        self._probe_index = probe_index
+        self._probe_commands = DEFAULT_PROBE_COMMANDS
+        self._schedule = {}
+        self._limiter = ConnectionLimiter()
+        self._retry = RetryPolicy()
 
     def read_settings(self) -> None:
         """
@@ -44,6 +194,31 @@ class ConfigReader:
             self.setting_syntax_checker(data)
             self._devices = data["devices"]
             self._commands = data["commands"]
+            self._limiter = ConnectionLimiter.from_settings(data.get("limits", {}))
+            self._retry = RetryPolicy.from_settings(data.get("retry", {}))
+            self._probe_commands = {**DEFAULT_PROBE_COMMANDS, **data.get("probe", {})}
+            self._schedule = data.get("schedule", {})
+
+    @property
+    def devices(self) -> dict:
+        """
+        :return: devices section of the read settings
+        """
+        return self._devices
+
+    @property
+    def limiter(self) -> ConnectionLimiter:
+        """
+        :return: connection limiter built from the limits section of the read settings
+        """
+        return self._limiter
+
+    @property
+    def schedule(self) -> dict:
+        """
+        :return: optional schedule section of the read settings, empty if not defined
+        """
+        return self._schedule
 
     def setting_syntax_checker(self, data: str) -> None:
         """
@@ -106,6 +281,9 @@ class ConfigReader:
                     raise TypeError(f"TYPE_ERROR: 'password' must be of type str in {dPath}")
                 if "secret" in props and not isinstance(props["secret"], str):
                     raise TypeError(f"TYPE_ERROR: 'secret' must be of type str in {dPath}")
+                # the interval is optional, it is only used by the scheduler
+                if "interval" in props and not is_positive_number(props["interval"]):
+                    raise ValueError(f"VALUE_ERROR: 'interval' must be a positive number in {dPath}")
         if "router" not in commands:
             raise KeyError(f"KEY_ERROR: Router Commands not found in {dPath}")
         if "switch" not in commands:
@@ -126,6 +304,66 @@ class ConfigReader:
                     if not isinstance(command, str):
                         raise TypeError(f"TYPE_ERROR: command must be of type str in {dPath}")
 
+        # the limits section is optional, missing keys mean no limit
+        if "limits" in data:
+            limits = data["limits"]
+            if not isinstance(limits, dict):
+                raise TypeError(f"TYPE_ERROR: 'limits' must be of type dict in {dPath}. Current: {type(limits)}")
+            max_connections = limits.get("max_connections_per_host")
+            if max_connections is not None and (not isinstance(max_connections, int) or max_connections < 1):
+                raise ValueError(f"VALUE_ERROR: 'max_connections_per_host' must be a positive integer in {dPath}")
+            rate = limits.get("connections_per_second")
+            if rate is not None and (not isinstance(rate, (int, float)) or rate <= 0):
+                raise ValueError(f"VALUE_ERROR: 'connections_per_second' must be a positive number in {dPath}")
+
+        # the retry section is optional, missing keys use the defaults of breaker.RetryPolicy
+        if "retry" in data:
+            retry = data["retry"]
+            if not isinstance(retry, dict):
+                raise TypeError(f"TYPE_ERROR: 'retry' must be of type dict in {dPath}. Current: {type(retry)}")
+            for key in ["attempts", "failure_threshold"]:
+                if key in retry and (not isinstance(retry[key], int) or isinstance(retry[key], bool)
+                                     or retry[key] < 1):
+                    raise ValueError(f"VALUE_ERROR: '{key}' must be a positive integer in {dPath}")
+            for key in ["backoff", "max_backoff", "open_seconds", "max_open_seconds"]:
+                if key in retry and not is_positive_number(retry[key]):
+                    raise ValueError(f"VALUE_ERROR: '{key}' must be a positive number in {dPath}")
+
+        # the probe section is optional, missing device types use DEFAULT_PROBE_COMMANDS
+        if "probe" in data:
+            probe = data["probe"]
+            if not isinstance(probe, dict):
+                raise TypeError(f"TYPE_ERROR: 'probe' must be of type dict in {dPath}. Current: {type(probe)}")
+            for device_type in probe:
+                if device_type not in ['switch', 'router']:
+                    raise ValueError(f"VALUE_ERROR: Device type '{device_type}' in 'probe' is not supported")
+                if not isinstance(probe[device_type], list) or not probe[device_type]:
+                    raise TypeError(f"TYPE_ERROR: probe commands must be a non-empty list in {dPath}")
+                for command in probe[device_type]:
+                    if not isinstance(command, str):
+                        raise TypeError(f"TYPE_ERROR: probe command must be of type str in {dPath}")
+
+        # the schedule section is optional, it is only used by the scheduler
+        if "schedule" in data:
+            schedule = data["schedule"]
+            if not isinstance(schedule, dict):
+                raise TypeError(f"TYPE_ERROR: 'schedule' must be of type dict in {dPath}. Current: {type(schedule)}")
+            jitter = schedule.get("jitter")
+            if jitter is not None and (
+                    not isinstance(jitter, (int, float)) or not 0 <= jitter <= scheduler.MAX_JITTER):
+                raise ValueError(f"VALUE_ERROR: 'jitter' must be a number between 0 and {scheduler.MAX_JITTER} "
+                                 f"in {dPath}")
+            for group in ["device_types", "hosts"]:
+                intervals = schedule.get(group, {})
+                if not isinstance(intervals, dict):
+                    raise TypeError(f"TYPE_ERROR: '{group}' must be of type dict in {dPath}. "
+                                    f"Current: {type(intervals)}")
+                for key in intervals:
+                    if group == "device_types" and key not in ['switch', 'router']:
+                        raise ValueError(f"VALUE_ERROR: Device type '{key}' in 'schedule' is not supported")
+                    if not is_positive_number(intervals[key]):
+                        raise ValueError(f"VALUE_ERROR: interval of '{key}' must be a positive number in {dPath}")
+
     def get_logging_str(self, ip, port):
         """
         gibt einen string zurück, der ein logging format entspricht:
@@ -143,42 +381,431 @@ class ConfigReader:
     def connect_to_devices(self) -> None:
         """
         Connects to devices specified in reader_settings.json file.
-        Writes the output to the destination path specified in creating of the object.
+        Writes the output to the destination path specified in creating of the object, if keep_raw is set.
+        If more than one worker is configured, the devices are read concurrently. Every device writes only its own
+        raw output file, so the files are the same as in a serial run.
+        :return: None
+        """
+        devices = [(ip, port) for ip in self._devices for port in self._devices[ip]]
+        if self._session_pool is not None:
+            self._session_pool.retain(devices)
+        if self._prescan_timeout is not None:
+            devices = self._prescan(devices)
+        if self._transport == "asyncio":
+            asyncio.run(self._connect_to_devices_async(devices))
+            return
+        if self._workers == 1:
+            for ip, port in devices:
+                self.read_device(ip, port)
+            return
+        logger.info(f"CONCURRENT_COLLECTION_START devices={len(devices)} workers={self._workers}")
+        with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="config_reader") as pool:
+            # the results are collected in inventory order, failures are already handled inside read_device
+            for future in [pool.submit(self.read_device, ip, port) for ip, port in devices]:
+                future.result()
+        logger.info("CONCURRENT_COLLECTION_FINISHED")
+
+    def _prescan(self, devices: list) -> list:
+        """
+        Leaves out the devices whose port does not accept a TCP connection, they are reported right away
+        :param devices: list of (ip, port) tuples
+        :return: the reachable devices
+        """
+        reachable, unreachable = prescan.scan(devices, self._prescan_timeout)
+        for (ip, port), error in unreachable.items():
+            logger.warning(f"PRESCAN_UNREACHABLE ip={ip} port={port} error={error}")
+            print(f"\033[31m{self.get_logging_str(ip, port)}--PRESCAN_UNREACHABLE: {error}\033[0m")
+            self._finish_metrics(self._start_metrics(ip, port), "unreachable")
+        return reachable
+
+    async def _connect_to_devices_async(self, devices: list) -> None:
+        """
+        Reads all devices in one event loop, at most as many devices as workers are configured at the same time
+        :param devices: list of (ip, port) tuples
         :return: None
         """
-        for ip in self._devices:
-            for port in self._devices[ip]:
-                prop = self._devices[ip][port]
-                try:
-                    connection = connector.Connector(prop["device_ios"], ip, port, prop["username"], prop["password"],
-                                                     prop["secret"] if "secret" in prop else None)
-
-                    connection.connect()
-                    connection.go_to_priv_exec_mode()
-                    prompt = connection.conn.find_prompt()
-                    t = datetime.now()
-                    for section in self._commands[prop["device_type"]]:
-                        section_responds = ""
-                        for command in self._commands[prop["device_type"]][section]:
-                            resp = connection.send_command_with_response(command, expected_str=r'#', read_timeout=90)
-                            if not resp[0]:
-                                colorRed = "\033[31m"
-                                colorReset = "\033[0m"
-                                print(
-                                    f"{colorRed}{self.get_logging_str(ip, port)}--WARNING_COMMAND_ERROR: {resp[1]}{colorReset}")
-                                continue
-                            section_responds += resp[1].rstrip()[:-(len(prompt))]
-                        self.write_to_dest(
-                            f"{ip}_{port}-{t.year}_{t.month:02d}_{t.day:02d}-{t.hour:02d}_{t.minute:02d}_{t.second:02d}_raw_config.txt",
-                            section_responds, section)
-                except Exception as e:
-                    logger.error(f"{ip}:{port}--{e}")
-                    logger.warning(f"{ip}:{port}--WARNING_SKIPPED_DEVICE")
-                    colorRed = "\033[31m"
-                    colorReset = "\033[0m"
-                    print(f"{colorRed}{self.get_logging_str(ip, port)}--{e}{colorReset}")
-                    print(f"{colorRed}{self.get_logging_str(ip, port)}--WARNING_SKIPPED_DEVICE{colorReset}")
-                    continue
+        logger.info(f"ASYNC_COLLECTION_START devices={len(devices)} workers={self._workers}")
+        workers = asyncio.Semaphore(self._workers)
+
+        async def read(ip: str, port: str) -> DeviceCapture | None:
+            async with workers:
+                return await self.read_device_async(ip, port)
+
+        await asyncio.gather(*(read(ip, port) for ip, port in devices))
+        logger.info("ASYNC_COLLECTION_FINISHED")
+
+    def _skip_device(self, ip: str, port: str, e: Exception) -> None:
+        """
+        Logs and prints the error of a device that could not be read
+        """
+        logger.error(f"{ip}:{port}--{e}")
+        logger.warning(f"{ip}:{port}--WARNING_SKIPPED_DEVICE")
+        colorRed = "\033[31m"
+        colorReset = "\033[0m"
+        print(f"{colorRed}{self.get_logging_str(ip, port)}--{e}{colorReset}")
+        print(f"{colorRed}{self.get_logging_str(ip, port)}--WARNING_SKIPPED_DEVICE{colorReset}")
+
+    def _retry_delay(self, ip: str, port: str, attempt: int, e: Exception) -> float | None:
+        """
+        :param attempt: number of the failed attempt, starting with 1
+        :param e: error of the failed attempt
+        :return: seconds to wait before the device is tried again, None if it is not tried again
+        """
+        if attempt >= self._retry.attempts or not isinstance(e, connector.RECOVERABLE_ERRORS):
+            return None
+        delay = self._retry.delay(attempt)
+        logger.warning(f"READ_RETRY ip={ip} port={port} attempt={attempt} delay={delay:.1f} error={e}")
+        return delay
+
+    def _start_metrics(self, ip: str, port: str) -> DeviceMetrics | None:
+        return self._metrics.start_device(ip, port) if self._metrics is not None else None
+
+    def _device_metrics(self, ip: str, port: str) -> DeviceMetrics | None:
+        return self._metrics.device(ip, port) if self._metrics is not None else None
+
+    @staticmethod
+    def _finish_metrics(device_metrics: DeviceMetrics | None, status: str, start: float = None,
+                        attempts: int = 0) -> None:
+        """
+        :param device_metrics: metrics of the device, nothing is recorded if None
+        :param status: result of the read, see metrics.DeviceMetrics
+        :param start: perf_counter() at the start of the read, None if the device was not read
+        :param attempts: number of attempts of the read
+        """
+        if device_metrics is None:
+            return
+        device_metrics.status = status
+        device_metrics.attempts = attempts
+        if start is not None:
+            device_metrics.read_seconds = round(time.perf_counter() - start, 4)
+
+    def _device_failed(self, ip: str, port: str, e: Exception) -> None:
+        if self._breaker is not None:
+            self._breaker.record_failure(ip, port, self._retry, e)
+        self._skip_device(ip, port, e)
+
+    def read_device(self, ip: str, port: str) -> DeviceCapture | None:
+        """
+        Reads a single device while respecting the connection limits of its host. Errors the device may recover from
+        are tried again after a backoff (see the retry section of reader_settings.json), any other error is logged
+        and the device is skipped, so one failing device never affects the others.
+        :param ip: IP address of the device as defined in reader_settings.json
+        :param port: port of the device as defined in reader_settings.json
+        :return: the captured sections of the device, None if the device was skipped
+        """
+        device_metrics = self._start_metrics(ip, port)
+        if self._breaker is not None and not self._breaker.allow(ip, port):
+            self._finish_metrics(device_metrics, "skipped")
+            return None
+        start = time.perf_counter()
+        # every attempt writes to the same raw output file, see _remove_raw_file()
+        file_name = self._new_file_name(ip, port)
+        attempt = 1
+        while True:
+            try:
+                # the session slot of the host is freed while waiting for the next attempt. A pooled session waits for
+                # the connection rate only if it really opens a new connection, see _open_pooled_connection()
+                with self._limiter.session(ip, connect=self._session_pool is None):
+                    capture = self._collect(ip, port, file_name)
+                break
+            except Exception as e:
+                delay = self._retry_delay(ip, port, attempt, e)
+                if delay is None:
+                    self._finish_metrics(device_metrics, "failed", start, attempt)
+                    self._device_failed(ip, port, e)
+                    return None
+            self._remove_raw_file(file_name)
+            time.sleep(delay)
+            attempt += 1
+        self._finish_metrics(device_metrics, "read", start, attempt)
+        if self._breaker is not None:
+            self._breaker.record_success(ip, port)
+        # the session is already closed, so waiting for space in the queue does not block the device
+        if self._result_queue is not None:
+            self._result_queue.put(capture)
+        return capture
+
+    async def read_device_async(self, ip: str, port: str) -> DeviceCapture | None:
+        """
+        Same as read_device(), but uses the asyncio transport
+        :param ip: IP address of the device as defined in reader_settings.json
+        :param port: port of the device as defined in reader_settings.json
+        :return: the captured sections of the device, None if the device was skipped
+        """
+        device_metrics = self._start_metrics(ip, port)
+        if self._breaker is not None and not self._breaker.allow(ip, port):
+            self._finish_metrics(device_metrics, "skipped")
+            return None
+        start = time.perf_counter()
+        file_name = self._new_file_name(ip, port)
+        attempt = 1
+        while True:
+            try:
+                async with self._limiter.async_session(ip):
+                    capture = await self._collect_async(ip, port, file_name)
+                break
+            except Exception as e:
+                delay = self._retry_delay(ip, port, attempt, e)
+                if delay is None:
+                    self._finish_metrics(device_metrics, "failed", start, attempt)
+                    self._device_failed(ip, port, e)
+                    return None
+            self._remove_raw_file(file_name)
+            await asyncio.sleep(delay)
+            attempt += 1
+        self._finish_metrics(device_metrics, "read", start, attempt)
+        if self._breaker is not None:
+            self._breaker.record_success(ip, port)
+        if self._result_queue is not None:
+            # a full queue must not block the event loop and with it all other sessions
+            await asyncio.to_thread(self._result_queue.put, capture)
+        return capture
+
+    def _collect(self, ip: str, port: str, file_name: str) -> DeviceCapture:
+        """
+        Connects to the device, sends all commands of its device type and captures the responses section by
+        section. If keep_raw is set, every section is also written to a raw output file as soon as it is read.
+        The connection is closed afterward, unless a session pool is used.
+        :param ip: IP address of the device
+        :param port: port of the device
+        :param file_name: name of the raw output file
+        :return: the captured sections
+        """
+        if self._session_pool is not None:
+            return self._collect_pooled(ip, port, file_name)
+        connection = self._open_connection(ip, port)
+        try:
+            return self._read_sections(connection, ip, port, file_name)
+        finally:
+            connection.disconnect()
+
+    def _collect_pooled(self, ip: str, port: str, file_name: str) -> DeviceCapture:
+        """
+        Same as _collect(), but uses the session of the device from the session pool and keeps it open. The pool keeps
+        at most max_connections_per_host sessions to a host open, as the session slot of the limiter is freed when the
+        read is finished, but the session is not closed.
+        If a reused session fails, e.g. because the device was reloaded in the meantime, the session is opened again
+        and the device is read once more.
+        :param ip: IP address of the device
+        :param port: port of the device
+        :param file_name: name of the raw output file
+        :return: the captured sections
+        """
+        reused = False
+        max_per_host = self._limiter.max_connections_per_host
+        try:
+            with self._session_pool.session(ip, port, self._open_pooled_connection, max_per_host) as session:
+                reused = session.reused
+                return self._read_sections(session.connection, ip, port, file_name)
+        except Exception as e:
+            if not reused:
+                raise
+            logger.warning(f"SESSION_RETRY ip={ip} port={port} error={e}")
+        self._remove_raw_file(file_name)
+        with self._session_pool.session(ip, port, self._open_pooled_connection, max_per_host) as session:
+            return self._read_sections(session.connection, ip, port, file_name)
+
+    def _remove_raw_file(self, file_name: str) -> None:
+        """
+        Removes the sections a failed attempt already wrote, so the next attempt does not append the same sections to
+        the file again and no incomplete raw output file is left behind
+        :param file_name: name of the raw output file
+        :return: None
+        """
+        if self._keep_raw:
+            self._dest_path.joinpath(raw_archive.archive_name(file_name, self._compression)).unlink(missing_ok=True)
+
+    def _open_pooled_connection(self, ip: str, port: str) -> connector.Connector:
+        """
+        Same as _open_connection(), but waits for the connection rate of the host first, since the limiter session of
+        a pooled read does not
+        """
+        self._limiter.wait_for_connect(ip)
+        return self._open_connection(ip, port)
+
+    def _open_connection(self, ip: str, port: str) -> connector.Connector:
+        """
+        Connects to the device and goes to the privileged exec mode
+        :param ip: IP address of the device
+        :param port: port of the device
+        :return: the connected Connector
+        """
+        prop = self._devices[ip][port]
+        device_metrics = self._device_metrics(ip, port)
+        connection = connector.Connector(prop["device_ios"], ip, port, prop["username"], prop["password"],
+                                         prop["secret"] if "secret" in prop else None, self._timing_profile(ip, port),
+                                         device_metrics)
+        try:
+            start = time.perf_counter()
+            connection.connect()
+            connected = time.perf_counter()
+            connection.go_to_priv_exec_mode()
+            self._record_login(device_metrics, start, connected)
+        except Exception:
+            connection.disconnect()
+            raise
+        return connection
+
+    @staticmethod
+    def _record_login(device_metrics: DeviceMetrics | None, start: float, connected: float) -> None:
+        """
+        :param start: perf_counter() before the session was opened
+        :param connected: perf_counter() once the session was open, the privileged exec mode is reached now
+        """
+        if device_metrics is not None:
+            device_metrics.connect_seconds = round(connected - start, 4)
+            device_metrics.privileged_seconds = round(time.perf_counter() - connected, 4)
+
+    def _timing_profile(self, ip: str, port: str) -> TimingProfile | None:
+        return self._timing.profile(ip, port) if self._timing is not None else None
+
+    @staticmethod
+    def _new_file_name(ip: str, port: str) -> str:
+        """
+        :return: name of the raw output file of a device read now
+        """
+        t = datetime.now()
+        return f"{ip}_{port}-{t.year}_{t.month:02d}_{t.day:02d}-{t.hour:02d}_{t.minute:02d}_{t.second:02d}_raw_config.txt"
+
+    def _read_sections(self, connection: connector.Connector, ip: str, port: str, file_name: str) -> DeviceCapture:
+        """
+        Sends the probe and the commands of the device type over an open connection in privileged exec mode
+        :param connection: the open connection
+        :param ip: IP address of the device
+        :param port: port of the device
+        :param file_name: name of the raw output file
+        :return: the captured sections
+        """
+        prop = self._devices[ip][port]
+        # a session of the pool was opened by an earlier read, the answers belong to this read and are measured into
+        # the timing store of this read, which is the one saved afterward
+        connection.metrics = self._device_metrics(ip, port)
+        connection.timing = self._timing_profile(ip, port)
+        prompt = connection.find_prompt()
+        capture = DeviceCapture(ip, port, file_name)
+        if self._probe_index is not None:
+            probe_commands = self._probe_commands[prop["device_type"]]
+            if self._batch_read:
+                responses = connection.send_show_batch(probe_commands, read_timeout=90)
+            else:
+                responses = [connection.send_command_with_response(command, expected_str=r'#', read_timeout=90)
+                             for command in probe_commands]
+            capture.probe = self._join_responses(ip, port, prompt, responses)
+            if self._is_unchanged(capture):
+                return capture
+        commands = self._commands[prop["device_type"]]
+        if self._batch_read:
+            answers = iter(connection.send_show_batch(
+                [command for section in commands for command in commands[section]], read_timeout=90))
+            for section in commands:
+                self._add_section(capture, section, prompt, [next(answers) for _ in commands[section]])
+            return capture
+        for section in commands:
+            responses = [connection.send_command_with_response(command, expected_str=r'#', read_timeout=90)
+                         for command in commands[section]]
+            self._add_section(capture, section, prompt, responses)
+        return capture
+
+    async def _collect_async(self, ip: str, port: str, file_name: str) -> DeviceCapture:
+        """
+        Same as _collect(), but uses an AsyncConnector. The capture has the same content as with netmiko.
+        :param ip: IP address of the device
+        :param port: port of the device
+        :param file_name: name of the raw output file
+        :return: the captured sections
+        """
+        prop = self._devices[ip][port]
+        device_metrics = self._device_metrics(ip, port)
+        connection = AsyncConnector(prop["device_ios"], ip, port, prop["username"], prop["password"],
+                                    prop["secret"] if "secret" in prop else None, timing=self._timing_profile(ip, port),
+                                    metrics=device_metrics)
+        try:
+            start = time.perf_counter()
+            await connection.connect()
+            connected = time.perf_counter()
+            await connection.go_to_priv_exec_mode()
+            self._record_login(device_metrics, start, connected)
+            prompt = await connection.find_prompt()
+            capture = DeviceCapture(ip, port, file_name)
+            if self._probe_index is not None:
+                probe_commands = self._probe_commands[prop["device_type"]]
+                if self._batch_read:
+                    responses = await connection.send_show_batch(probe_commands, read_timeout=90)
+                else:
+                    responses = [await connection.send_command_with_response(command, expected_str=r'#',
+                                                                             read_timeout=90)
+                                 for command in probe_commands]
+                capture.probe = self._join_responses(ip, port, prompt, responses)
+                if self._is_unchanged(capture):
+                    return capture
+            commands = self._commands[prop["device_type"]]
+            if self._batch_read:
+                answers = iter(await connection.send_show_batch(
+                    [command for section in commands for command in commands[section]], read_timeout=90))
+                for section in commands:
+                    self._add_section(capture, section, prompt, [next(answers) for _ in commands[section]])
+                return capture
+            for section in commands:
+                responses = [await connection.send_command_with_response(command, expected_str=r'#', read_timeout=90)
+                             for command in commands[section]]
+                self._add_section(capture, section, prompt, responses)
+            return capture
+        finally:
+            await connection.disconnect()
+
+    def _add_section(self, capture: DeviceCapture, section: str, prompt: str, responses: list) -> None:
+        """
+        Adds the responses of the commands of a section to the capture, failed commands are skipped
+        :param capture: capture of the device
+        :param section: name of the section
+        :param prompt: prompt of the device
+        :param responses: (success, output) tuples of the commands of the section
+        :return: None
+        """
+        section_responds = ""
+        for resp in responses:
+            if not resp[0]:
+                colorRed = "\033[31m"
+                colorReset = "\033[0m"
+                print(
+                    f"{colorRed}{self.get_logging_str(capture.ip, capture.port)}--WARNING_COMMAND_ERROR: {resp[1]}"
+                    f"{colorReset}")
+                continue
+            section_responds += resp[1].rstrip()[:-(len(prompt))]
+        capture.add_section(section, section_responds)
+        if self._keep_raw:
+            self.write_to_dest(capture.file_name, section_responds, section)
+            capture.raw_file = self._dest_path.joinpath(raw_archive.archive_name(capture.file_name,
+                                                                                 self._compression))
+
+    def _join_responses(self, ip: str, port: str, prompt: str, responses: list) -> str | None:
+        """
+        :param responses: (success, output) tuples of the probe commands
+        :return: the joined output of the probe commands, None if a command failed
+        """
+        output = ""
+        for resp in responses:
+            if not resp[0]:
+                logger.warning(f"{ip}:{port}--WARNING_PROBE_COMMAND_ERROR: {resp[1]}")
+                return None
+            # only an existing prompt is removed, cutting off characters could hide the part of the output that changed
+            output += resp[1].rstrip().removesuffix(prompt).rstrip() + "\n"
+        return output
+
+    def _is_unchanged(self, capture: DeviceCapture) -> bool:
+        """
+        Compares the probe output of the device with the one stored with its latest configuration. An empty probe
+        output tells nothing about the device, so it is always read completely then.
+        :param capture: capture with the probe output of the device
+        :return: True if the device does not have to be read
+        """
+        if capture.probe is None or capture.probe.strip() == "":
+            return False
+        if capture.probe != self._probe_index.probe(capture.ip, capture.port):
+            return False
+        logger.info(f"PROBE_UNCHANGED ip={capture.ip} port={capture.port}")
+        capture.unchanged = True
+        return True
 
     def write_to_dest(self, file_name: str, config: str, section: str) -> None:
         """
@@ -189,15 +816,15 @@ class ConfigReader:
         hostname R1
 
         *** *** *** run *** *** ***
+        If a compression is configured, the section is appended to the file as a new compressed stream.
         :param file_name: name of the file to write to
         :param config: string to be appended to destination path
         :param section: string to mark beginning and end of section
         :return:
         """
-        with open(self._dest_path.joinpath(Path(file_name)), "a") as dest:
-            dest.write(f"** start {section} **\n")
-            dest.write(config)
-            dest.write(f"\n** end {section} **\n")
+        path = self._dest_path.joinpath(raw_archive.archive_name(file_name, self._compression))
+        with raw_archive.open_text(path, "a") as dest:
+            dest.write(format_section(section, config))
 
     def execute(self):
         """
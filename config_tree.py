@@ -0,0 +1,93 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+from typing import Iterator
+
+
+class ConfigNode:
+    """
+    A line of a running-config together with the lines indented below it, e.g. an interface, router, line or
+    access-list block. Empty lines belong to the block they follow.
+    Nodes only store their line and their children, leaves have no children list at all, so even configs with
+    tens of thousands of lines stay small.
+    """
+    __slots__ = ("line", "children")
+
+    def __init__(self, line: str) -> None:
+        """
+        :param line: the line including its line break
+        """
+        self.line = line
+        self.children = None
+
+    def __repr__(self) -> str:
+        return f"ConfigNode({self.header!r}, children={len(self.children) if self.children else 0})"
+
+    @property
+    def header(self) -> str:
+        return self.line.rstrip("\n")
+
+    def append(self, node: "ConfigNode") -> None:
+        if self.children is None:
+            self.children = []
+        self.children.append(node)
+
+    def child_lines(self) -> Iterator[str]:
+        """
+        :return: iterator over the lines of all nodes below this node, in the order of the config
+        """
+        stack = [iter(self.children or ())]
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                continue
+            yield node.line
+            if node.children:
+                stack.append(iter(node.children))
+
+    def lines(self) -> Iterator[str]:
+        """
+        :return: iterator over the line of this node followed by the lines of all nodes below it
+        """
+        yield self.line
+        yield from self.child_lines()
+
+    def render(self) -> str:
+        """
+        :return: the block as text, exactly as it was in the config
+        """
+        return "".join(self.lines())
+
+
+def build_tree(config: str) -> ConfigNode:
+    """
+    Builds the hierarchy of a running-config in one pass over its lines. A line that starts with a space belongs to
+    the closest line above it with a smaller indentation, empty lines belong to the current block.
+    :param config: running-config as text
+    :return: root node (empty line) with every top level line of the config as child
+    """
+    root = ConfigNode("")
+    # (indentation, node) of the current block and all its open sub-blocks
+    stack = []
+    for line in config.splitlines(keepends=True):
+        node = ConfigNode(line)
+        if line.strip() == "":
+            (stack[-1][1] if stack else root).append(node)
+            continue
+        indent = len(line) - len(line.lstrip(" "))
+        if indent == 0 or not stack:
+            root.append(node)
+            stack = [(indent, node)]
+            continue
+        # the top level block is never closed by an indented line
+        while len(stack) > 1 and stack[-1][0] >= indent:
+            stack.pop()
+        stack[-1][1].append(node)
+        stack.append((indent, node))
+    return root
@@ -8,6 +8,7 @@
 
 import re
 import socket
+import time
 from enum import Enum, auto
 from multiprocessing import AuthenticationError
 from re import error as PatternError
@@ -15,6 +16,17 @@ from typing import Tuple, List
 
 from netmiko import ConnectHandler, NetMikoTimeoutException, NetMikoAuthenticationException, ConnectionException, ReadTimeout
 
+from metrics import DeviceMetrics
+from timing import TimingProfile
+
+CONFIG_PROMPT_PATTERN = r"\(config[^\)]*\)#"
+# errors a device may recover from (e.g. while it reloads), a read failing with one of them is tried again
+RECOVERABLE_ERRORS = (TimeoutError, ConnectionError, ConnectionException, ReadTimeout)
+# commands that never change the exec mode, e.g. the commands reading the configuration
+MODE_KEEPING_COMMANDS = ("show ", "terminal ")
+# comment line sent after every command of a show batch, the echo of the marker separates the outputs
+SHOW_BATCH_MARKER = "! TOPORECOVER_SECTION_{}"
+
 
 class ExecMode(Enum):
     """
@@ -25,13 +37,79 @@ class ExecMode(Enum):
     PRIVILEGED_EXEC = auto()
 
 
+def mode_of_prompt(prompt: str) -> ExecMode:
+    """
+    :param prompt: prompt of the device, e.g. 'R1(config-if)#'
+    :return: the exec mode shown by the prompt, configuration sub modes count as GLOBAL_EXEC
+    """
+    if re.search(CONFIG_PROMPT_PATTERN + "$", prompt):
+        return ExecMode.GLOBAL_EXEC
+    if prompt.endswith("#"):
+        return ExecMode.PRIVILEGED_EXEC
+    return ExecMode.USER_EXEC
+
+
+def show_batch_lines(commands: List[str]) -> List[str]:
+    """
+    :param commands: show commands of a batch
+    :return: the lines sent for the batch, every command followed by its marker
+    """
+    lines = []
+    for index, command in enumerate(commands):
+        lines += [command.strip(), SHOW_BATCH_MARKER.format(index)]
+    return lines
+
+
+def split_show_batch(commands: List[str], output: str) -> List[Tuple[bool, str]]:
+    """
+    Splits the output of a show batch into the answers of its commands. The device echoes every marker after the
+    prompt that ends the output of the command before it, so the output of a command is everything between the echo
+    of the command and the echo of its marker.
+    :param commands: show commands of the batch in the order they were sent
+    :param output: raw output of the batch, starting with the echo of the first command
+    :return: (success, output) of every command, the same as send_command_with_response() returns
+    :raise RuntimeError: if the marker of a command is missing in the output
+    """
+    responses = []
+    lines = []
+    for line in output.replace("\r", "").split("\n"):
+        if len(responses) < len(commands) and line.rstrip().endswith(SHOW_BATCH_MARKER.format(len(responses))):
+            command = commands[len(responses)].strip()
+            # the echo of the command and anything printed before it are no part of the output
+            echo = next((i for i, text in enumerate(lines) if text.rstrip().endswith(command)), -1)
+            answer = "\n".join(lines[echo + 1:])
+            if "% Invalid input detected at '^' marker." in answer:
+                responses.append((False, command))
+            else:
+                responses.append((True, answer))
+            lines = []
+            continue
+        lines.append(line)
+    if len(responses) < len(commands):
+        raise RuntimeError(f"RUNTIME_ERROR: marker of command '{commands[len(responses)].strip()}' not found in the "
+                           f"output of the batch")
+    return responses
+
+
 class Connector:
     """
     Connector class to manage telnet connections to (virtual) network devices using the Netmiko library
     """
 
-    def __init__(self, device_type: str, ip: str, port: int, username: str = None, password: str = None, secret: str = None):
+    def __init__(self, device_type: str, ip: str, port: int, username: str = None, password: str = None, secret: str = None,
+                 timing: TimingProfile = None, metrics: DeviceMetrics = None):
+        """
+        :param timing: measured timing of the device, the timeouts are set from it and every answer is recorded in
+        it, without a profile the given timeouts are used as they are
+        :param metrics: if given, the duration and size of every answer is recorded in it
+        """
         self._conn = None
+        self.timing = timing
+        self.metrics = metrics
+        # the exec mode is tracked from the commands sent and the prompts seen, None if it is unknown
+        self._mode = None
+        # only for GLOBAL_EXEC: True in a sub mode like '(config-if)#', False in '(config)#', None if unknown
+        self._submode = None
         self._device = {}
         self.device_type = device_type
         self.ip = ip
@@ -215,8 +293,11 @@ class Connector:
             raise ConnectionError(
                 f'CONNECTION_ERROR: cannot establish multiple connections to one device, at {self.ip}:{self.port}')
         # Establish connection
+        self._forget_mode()
+        # slow devices get more time for the login and the preparation of the session
+        delay_factor = self.timing.delay_factor() if self.timing is not None else 1
         try:
-            self._conn = ConnectHandler(**self.device)
+            self._conn = ConnectHandler(**self.device, global_delay_factor=delay_factor)
             return True
         except NetMikoTimeoutException:
             # Gerät nicht erreichbar / Timeout
@@ -232,21 +313,169 @@ class Connector:
             # Fallback für alles andere
             raise Exception(f'UNKNOWN_ERROR: {e}')
 
+    def disconnect(self) -> None:
+        """
+        Closes the telnet connection to the device, does nothing if no connection is established
+        :return: is None
+        """
+        if self._conn is None:
+            return
+        try:
+            self._conn.disconnect()
+        except Exception:
+            # the session is dropped anyway, a failing logout must not hide the actual result
+            pass
+        finally:
+            self._conn = None
+            self._forget_mode()
+
+    def _forget_mode(self) -> None:
+        self._mode = None
+        self._submode = None
+
+    def _set_prompt(self, prompt: str) -> None:
+        prompt = prompt.strip()
+        self._mode = mode_of_prompt(prompt)
+        self._submode = "(config)#" not in prompt if self._mode == ExecMode.GLOBAL_EXEC else None
+
+    def _track_mode(self, command: str, expected_str: str | None) -> None:
+        """
+        Updates the exec mode after a command was answered. netmiko removes the prompt from the output, so the mode
+        is derived from the command and the expected prompt, it becomes unknown if the command may have changed it.
+        :param command: the answered command
+        :param expected_str: the pattern found at the end of the answer
+        """
+        cmd = command.strip()
+        if cmd == "" or cmd.startswith(MODE_KEEPING_COMMANDS):
+            return
+        if cmd == "end":
+            self._mode = ExecMode.PRIVILEGED_EXEC
+            self._submode = None
+        elif expected_str == CONFIG_PROMPT_PATTERN:
+            # the answer ended with a configuration prompt, a command may have entered or left a sub mode
+            self._mode = ExecMode.GLOBAL_EXEC
+            self._submode = False if cmd == "configure terminal" else None
+        else:
+            self._forget_mode()
+
+    def find_prompt(self) -> str:
+        """
+        Sends an empty line and returns the prompt of the device, the exec mode is taken from the prompt
+        :return: the current prompt, e.g. 'R1#'
+        :raise RuntimeError: if no connection is established
+        """
+        if self._conn is None:
+            raise RuntimeError("RUNTIME_ERROR: no current running connection, call connect() to establish connection")
+        prompt = self._conn.find_prompt()
+        self._set_prompt(prompt)
+        return prompt
+
+    def is_alive(self) -> bool:
+        """
+        :return: True if a connection is established and the socket is still open
+        """
+        if self._conn is None:
+            return False
+        try:
+            return self._conn.is_alive()
+        except Exception:
+            return False
+
+    def keepalive(self) -> None:
+        """
+        Sends an empty line and waits for the prompt, so the exec-timeout of the device does not close an idle session
+        :return: is None
+        :raise RuntimeError: if no connection is established
+        """
+        self.find_prompt()
+
     def send_command_with_response(self, command: str, expected_str: str = None, read_timeout: int = 10) -> Tuple[
         bool, str]:
         """
         Sends a command to the connected device and returns a tuple indicating success and the output in
         :param expected_str: is the expected string to be found at the end of the output
-        :param read_timeout: how long the code waits for a response before an exception is raised time in seconds
+        :param read_timeout: how long the code waits for a response before an exception is raised time in seconds,
+        with a timing profile only as long as the device or command was not measured
         :param command: is the command string to send to the device
         :return: (success: bool, output: str)
         """
-        output = self._conn.send_command(command, read_timeout=read_timeout, delay_factor=2, expect_string=expected_str)
+        if self.timing is not None:
+            read_timeout = self.timing.read_timeout(command, read_timeout)
+        start = time.perf_counter()
+        try:
+            output = self._conn.send_command(command, read_timeout=read_timeout, expect_string=expected_str)
+        except Exception:
+            # the mode of the device is unknown after a command without answer
+            self._forget_mode()
+            raise
+        seconds = time.perf_counter() - start
+        if self.timing is not None:
+            self.timing.record(command, seconds, len(output))
+        if self.metrics is not None:
+            self.metrics.record_command(command, seconds, len(output))
+        self._track_mode(command, expected_str)
         # Check for invalid output
         if "% Invalid input detected at '^' marker." in output:
             return False, command
         return True, output
 
+    def send_config_batch(self, commands: List[str], marker: str, read_timeout: float = 10) -> str:
+        """
+        Sends several configuration commands at once without waiting for the prompt after every command. A comment
+        line is sent as marker after the commands, the device processes the lines one after another, so all commands
+        are processed once the marker is echoed and followed by a prompt.
+        :param commands: commands to send, the device must already be in a configuration mode
+        :param marker: comment line (starting with '!') that does not occur in the commands
+        :param read_timeout: how long the code waits for the marker before an exception is raised time in seconds
+        :return: the raw output of the batch, every command echoed after its prompt followed by its output
+        :raise RuntimeError: if no connection is established
+        """
+        if self._conn is None:
+            raise RuntimeError("RUNTIME_ERROR: no current running connection, call connect() to establish connection")
+        lines = [command.rstrip("\r\n") for command in commands] + [marker]
+        self._forget_mode()
+        self._conn.write_channel(self._conn.RETURN.join(lines) + self._conn.RETURN)
+        # a command of the batch may leave the configuration mode, so any prompt ends the batch
+        output = self._conn.read_until_pattern(pattern=re.escape(marker) + r"\s*[\r\n]+[^\r\n]*[>#]",
+                                               read_timeout=read_timeout)
+        # the output ends with the prompt after the marker
+        self._set_prompt(output.rstrip().splitlines()[-1])
+        return output
+
+    def send_show_batch(self, commands: List[str], read_timeout: float = 10) -> List[Tuple[bool, str]]:
+        """
+        Sends several show commands at once, every command followed by a marker comment line, and reads the whole
+        answer as one stream. The device only has to be waited for once instead of once per command.
+        :param commands: show commands to send, the device must be in privileged exec mode
+        :param read_timeout: how long the code waits for the answer of one command, the batch waits as long as all
+        commands together, with a timing profile only as long as the device or command was not measured
+        :return: (success, output) of every command, see split_show_batch()
+        :raise RuntimeError: if no connection is established or a marker is missing
+        """
+        if self._conn is None:
+            raise RuntimeError("RUNTIME_ERROR: no current running connection, call connect() to establish connection")
+        if not commands:
+            return []
+        if self.timing is not None:
+            read_timeout = sum(self.timing.read_timeout(command, read_timeout) for command in commands)
+        else:
+            read_timeout = read_timeout * len(commands)
+        marker = SHOW_BATCH_MARKER.format(len(commands) - 1)
+        start = time.perf_counter()
+        self._conn.write_channel(self._conn.RETURN.join(show_batch_lines(commands)) + self._conn.RETURN)
+        try:
+            output = self._conn.read_until_pattern(pattern=re.escape(marker) + r"\s*[\r\n]+[^\r\n]*[>#]",
+                                                   read_timeout=read_timeout)
+        except Exception:
+            self._forget_mode()
+            raise
+        # show commands do not change the mode, the prompt after the last marker is only checked
+        self._set_prompt(output.rstrip().splitlines()[-1])
+        if self.metrics is not None:
+            self.metrics.record_command("; ".join(command.strip() for command in commands),
+                                        time.perf_counter() - start, len(output))
+        return split_show_batch(commands, output)
+
     def was_command_send_successfully(self, command: str, expected_str: str = None) -> bool:
         """
         Sends a command to the connected device and returns True if the parameter expected_str is found at the end of
@@ -261,7 +490,12 @@ class Connector:
             raise RuntimeError("RUNTIME_ERROR: no current running connection, call connect() to establish connection")
 
         # capture the output to check for errors
-        output = self._conn.send_command(command, expect_string=expected_str)
+        try:
+            output = self._conn.send_command(command, expect_string=expected_str)
+        except Exception:
+            self._forget_mode()
+            raise
+        self._track_mode(command, expected_str)
         if output.endswith("% Invalid input detected at '^' marker."):
             return False
         return True
@@ -285,18 +519,18 @@ class Connector:
 
     def get_exec_mode(self) -> ExecMode:
         """
-        Determines the current execution mode of the connected device based on the command prompt
+        Determines the current execution mode of the connected device from the commands sent and the prompts seen,
+        the device is only asked for its prompt if the mode is unknown
         :return: is an ExecMode enumeration value containing the current execution mode
         :raise RuntimeError: if unable to determine exec mode or no connection is established
         """
+        if self._mode is not None:
+            return self._mode
         try:
-            if self.conn.check_config_mode():
-                return ExecMode.GLOBAL_EXEC
-            if self.conn.check_enable_mode():
-                return ExecMode.PRIVILEGED_EXEC
-            return ExecMode.USER_EXEC
+            self.find_prompt()
         except Exception:
             raise RuntimeError("RUNTIME_ERROR: unable to determine exec mode, no connection established")
+        return self._mode
 
     def go_to_priv_exec_mode(self):
         """
@@ -309,26 +543,32 @@ class Connector:
         if current_mode == ExecMode.GLOBAL_EXEC:
             self.send_command_with_response("end", expected_str=".+#")
         if current_mode == ExecMode.USER_EXEC:
+            self._forget_mode()
             try:
                 self.conn.enable()
             except ReadTimeout:
                 raise RuntimeError(f"RUNTIME_ERROR: unable to enter privileged execution mode due to missing " +
                                    f"'secret' parameter in settings file")
+            self._mode = ExecMode.PRIVILEGED_EXEC
+
+    def _in_config_mode(self) -> bool | None:
+        """
+        :return: True in the Global execution mode outside any sub mode ('(config)#'), False in any other known mode,
+        None if only the prompt tells, e.g. after a configuration command that may have entered or left a sub mode
+        """
+        if self._mode is None or (self._mode == ExecMode.GLOBAL_EXEC and self._submode is None):
+            return None
+        return self._mode == ExecMode.GLOBAL_EXEC and not self._submode
 
     def go_to_glob_exec_mode(self) -> None:
         """
-        From any mode goes into the Global execution mode.
+        From any mode goes into the Global execution mode. A configuration sub mode (e.g. interface) is left,
+        nothing is sent if the device is already in the Global execution mode.
         :return:
         """
-        current_mode = self.get_exec_mode()
-        if current_mode == ExecMode.GLOBAL_EXEC:
-            self.send_command_with_response("end", expected_str=".+#")
-            self.send_command_with_response("configure terminal", expected_str=r"\(config[^\)]*\)#")
-            return
-        if current_mode == ExecMode.PRIVILEGED_EXEC:
-            self.send_command_with_response("configure terminal", expected_str=r"\(config[^\)]*\)#")
+        if self._in_config_mode() is None:
+            self.find_prompt()
+        if self._in_config_mode():
             return
-        if current_mode == ExecMode.USER_EXEC:
-            self.go_to_priv_exec_mode()
-            self.send_command_with_response("configure terminal", expected_str=r"\(config[^\)]*\)#")
-            return
\ No newline at end of file
+        self.go_to_priv_exec_mode()
+        self.send_command_with_response("configure terminal", expected_str=CONFIG_PROMPT_PATTERN)
\ No newline at end of file
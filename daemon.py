@@ -0,0 +1,181 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import json
+import logging
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime
+from typing import Callable
+
+from scheduler import CollectionScheduler
+from session_pool import SessionPool
+
+logger = logging.getLogger(__name__)
+
+CONTROL_HOST = "127.0.0.1"
+CONTROL_COMMANDS = ["collect", "status", "stop"]
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    """
+    Handles one line based request on the control channel and answers with one line
+    """
+
+    def handle(self) -> None:
+        command = self.rfile.readline(1024).decode("utf-8", errors="replace").strip()
+        reply = self.server.topo_daemon.handle_command(command)
+        self.wfile.write((reply + "\n").encode("utf-8"))
+
+
+class _ControlServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple, daemon) -> None:
+        super().__init__(address, _ControlHandler)
+        self.topo_daemon = daemon
+
+
+class Daemon:
+    """
+    Keeps running and collects the configurations of all devices periodically. The sessions to the devices stay
+    open between the collections (see SessionPool), so only the first collection has to log in to the devices.
+    The daemon is controlled over a TCP control channel that only listens on localhost, one command per connection:
+
+    - collect: starts a collection now
+    - status: returns the state of the daemon and the sessions as JSON
+    - stop: stops the daemon after the running collection
+
+    With a scheduler, the daemon does not collect all devices at once, but runs the scheduler, which reads every
+    device at its own interval (see CollectionScheduler). 'collect' then makes all devices due now.
+    """
+
+    def __init__(self, collect: Callable[[SessionPool], None] | None, interval: float,
+                 keepalive_interval: float = 60, control_port: int = 9099,
+                 scheduler: CollectionScheduler = None, session_pool: SessionPool = None) -> None:
+        """
+        :param collect: function reading and parsing all devices with the given session pool, None with a scheduler
+        :param interval: seconds between the start of two collections
+        :param keepalive_interval: seconds a session may be idle before a keepalive is sent
+        :param control_port: port of the control channel on localhost
+        :param scheduler: runs instead of the periodic collections, its devices must be read with session_pool
+        :param session_pool: pool of the device sessions, a new pool is created if None
+        """
+        if not isinstance(interval, (int, float)) or interval <= 0:
+            raise ValueError(f"VALUE_ERROR: interval must be a positive number -> currently: {interval}")
+        if collect is None and scheduler is None:
+            raise ValueError("VALUE_ERROR: either collect or scheduler must be given")
+        self._collect = collect
+        self._interval = interval
+        self._control_port = control_port
+        self.pool = session_pool if session_pool is not None else SessionPool(keepalive_interval)
+        self.scheduler = scheduler
+        self._trigger = threading.Event()
+        self._stop = threading.Event()
+        self._collecting = False
+        self._collections = 0
+        self._last_collection = None
+        self._last_duration = None
+
+    def __repr__(self) -> str:
+        return f"Daemon(interval={self._interval}, control_port={self._control_port}, pool={self.pool})"
+
+    def handle_command(self, command: str) -> str:
+        """
+        :param command: command received over the control channel
+        :return: the reply sent back
+        """
+        logger.info(f"DAEMON_CONTROL_COMMAND command={command}")
+        if command == "collect":
+            if self.scheduler is not None:
+                self.scheduler.trigger()
+                return "OK all devices due now"
+            self._trigger.set()
+            return "OK collection started" if not self._collecting else "OK collection queued"
+        if command == "status":
+            if self.scheduler is not None:
+                return json.dumps({"schedule": self.scheduler.status(), "sessions": self.pool.status()})
+            return json.dumps({
+                "collecting": self._collecting,
+                "collections": self._collections,
+                "last_collection": self._last_collection,
+                "last_duration_seconds": self._last_duration,
+                "sessions": self.pool.status()
+            })
+        if command == "stop":
+            self.stop()
+            return "OK stopping"
+        return f"ERROR unknown command '{command}', use one of {CONTROL_COMMANDS}"
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._trigger.set()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+
+    def _run_collection(self) -> None:
+        self._collecting = True
+        start = time.perf_counter()
+        self._last_collection = datetime.now().isoformat(timespec="seconds")
+        logger.info(f"DAEMON_COLLECTION_START number={self._collections + 1}")
+        try:
+            self._collect(self.pool)
+        except Exception as e:
+            # a failed collection must not stop the daemon, the next one is tried at the next interval
+            logger.error(f"DAEMON_COLLECTION_ERROR error={e}", exc_info=True)
+        finally:
+            self._collecting = False
+            self._collections += 1
+            self._last_duration = round(time.perf_counter() - start, 3)
+            logger.info(f"DAEMON_COLLECTION_FINISHED number={self._collections} seconds={self._last_duration}")
+
+    def run(self) -> None:
+        """
+        Runs the daemon until the stop command is received. The first collection starts right away.
+        :return: None
+        """
+        server = _ControlServer((CONTROL_HOST, self._control_port), self)
+        server_thread = threading.Thread(target=server.serve_forever, name="daemon_control", daemon=True)
+        server_thread.start()
+        self.pool.start()
+        logger.info(f"DAEMON_STARTED interval={self._interval} control={CONTROL_HOST}:{self._control_port}")
+        try:
+            if self.scheduler is not None:
+                self.scheduler.run()
+            while not self._stop.is_set():
+                started = time.monotonic()
+                self._trigger.clear()
+                self._run_collection()
+                # waits for the next interval or an earlier collect/stop command
+                self._trigger.wait(max(0.0, self._interval - (time.monotonic() - started)))
+        finally:
+            server.shutdown()
+            server.server_close()
+            self.pool.close()
+            logger.info("DAEMON_STOPPED")
+
+
+def send_control_command(command: str, control_port: int = 9099, timeout: float = 10) -> str:
+    """
+    Sends a command to a running daemon
+    :param command: one of CONTROL_COMMANDS
+    :param control_port: port of the control channel on localhost
+    :param timeout: seconds to wait for the reply
+    :return: the reply of the daemon
+    :raise ConnectionError: if no daemon is listening on the port
+    """
+    try:
+        with socket.create_connection((CONTROL_HOST, control_port), timeout=timeout) as sock:
+            sock.sendall((command + "\n").encode("utf-8"))
+            with sock.makefile("r", encoding="utf-8") as reply:
+                return reply.readline().strip()
+    except OSError as e:
+        raise ConnectionError(f"CONNECTION_ERROR: no daemon listening on {CONTROL_HOST}:{control_port} -> {e}")
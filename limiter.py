@@ -0,0 +1,135 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionLimiter:
+    """
+    Limits the connections opened to one host (e.g. a GNS3 server with many console ports).
+    Every host gets a maximum number of sessions that may be open at the same time and a maximum number of new
+    sessions per second. The limits are shared by all threads using the same limiter object.
+    """
+
+    def __init__(self, max_connections_per_host: int = None, connections_per_second: float = None) -> None:
+        """
+        :param max_connections_per_host: maximum number of open sessions per host, None for no limit
+        :param connections_per_second: maximum number of new sessions per second and host, None for no limit
+        :raise ValueError: if a limit is not a positive number
+        """
+        if max_connections_per_host is not None and (
+                not isinstance(max_connections_per_host, int) or max_connections_per_host < 1):
+            raise ValueError(f"VALUE_ERROR: 'max_connections_per_host' must be a positive integer "
+                             f"-> currently: {max_connections_per_host}")
+        if connections_per_second is not None and (
+                not isinstance(connections_per_second, (int, float)) or connections_per_second <= 0):
+            raise ValueError(f"VALUE_ERROR: 'connections_per_second' must be a positive number "
+                             f"-> currently: {connections_per_second}")
+        self._max_connections_per_host = max_connections_per_host
+        self._connections_per_second = connections_per_second
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._async_slots = {}
+        self._next_connect = {}
+
+    def __repr__(self) -> str:
+        return (f"ConnectionLimiter(max_connections_per_host={self._max_connections_per_host}, "
+                f"connections_per_second={self._connections_per_second})")
+
+    @property
+    def max_connections_per_host(self) -> int | None:
+        return self._max_connections_per_host
+
+    def _get_slots(self, host: str) -> threading.BoundedSemaphore | None:
+        if self._max_connections_per_host is None:
+            return None
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self._max_connections_per_host)
+            return self._slots[host]
+
+    def _reserve_connect(self, host: str) -> float:
+        """
+        Reserves the next connection time of the host. The times are reserved in advance, so waiting sessions are
+        spread evenly instead of all connecting at once after the delay.
+        :return: seconds to wait until the connection may be opened
+        """
+        if self._connections_per_second is None:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            connect_at = max(now, self._next_connect.get(host, now))
+            self._next_connect[host] = connect_at + 1 / self._connections_per_second
+        return connect_at - now
+
+    def wait_for_connect(self, host: str) -> None:
+        """
+        Waits until the connection rate of the host allows a new connection
+        :param host: IP address of the host the connection is opened to
+        :return: None
+        """
+        delay = self._reserve_connect(host)
+        if delay > 0:
+            time.sleep(delay)
+
+    @contextmanager
+    def session(self, host: str, connect: bool = True):
+        """
+        Context manager around a whole device session. Waits for a free session slot of the host and for the
+        connection rate, the slot is freed again when the context is left.
+        :param host: IP address of the host the session is opened to
+        :param connect: False if the session may not open a new connection (e.g. a session of a SessionPool), the
+        connection rate is then left to wait_for_connect() once a connection is really opened
+        """
+        slots = self._get_slots(host)
+        if slots is not None and not slots.acquire(blocking=False):
+            logger.info(f"CONNECTION_LIMIT_REACHED host={host} waiting for a free session slot")
+            slots.acquire()
+        try:
+            if connect:
+                self.wait_for_connect(host)
+            yield
+        finally:
+            if slots is not None:
+                slots.release()
+
+    @asynccontextmanager
+    async def async_session(self, host: str):
+        """
+        Same as session(), but waits without blocking the event loop. Must always be used from the same event loop.
+        :param host: IP address of the host the session is opened to
+        """
+        slots = None
+        if self._max_connections_per_host is not None:
+            slots = self._async_slots.setdefault(host, asyncio.Semaphore(self._max_connections_per_host))
+            if slots.locked():
+                logger.info(f"CONNECTION_LIMIT_REACHED host={host} waiting for a free session slot")
+            await slots.acquire()
+        try:
+            delay = self._reserve_connect(host)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
+        finally:
+            if slots is not None:
+                slots.release()
+
+    @classmethod
+    def from_settings(cls, limits: dict):
+        """
+        Creates a limiter from the optional 'limits' section of reader_settings.json
+        :param limits: dict with the optional keys 'max_connections_per_host' and 'connections_per_second'
+        :return: ConnectionLimiter with the given limits
+        """
+        return cls(limits.get("max_connections_per_host"), limits.get("connections_per_second"))
@@ -0,0 +1,94 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MATCHLIST_PATH = Path("settings/matchlist")
+
+# loaded matchlists by absolute path, every process builds its own cache
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class Matchlist:
+    """
+    The compiled patterns of a matchlist file. Every line of the file is a regex for default configuration that is
+    removed from the parsed configuration. The patterns are compiled once and can be used by any number of parse calls.
+    """
+
+    def __init__(self, lines: list[str], mtime_ns: int = 0) -> None:
+        """
+        :param lines: lines of the matchlist file including their line breaks
+        :param mtime_ns: modification time of the file the lines were read from
+        """
+        self.mtime_ns = mtime_ns
+        self.patterns = [re.compile("^\\s*" + line + "+", flags=re.M) for line in lines]
+        # one pattern trying all lines at once replaces a python loop over the patterns for every single line
+        try:
+            self._any_pattern = re.compile("|".join(f"(?:{p.pattern})" for p in self.patterns), flags=re.M)
+        except re.error:
+            self._any_pattern = None
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def sub(self, config: str) -> str:
+        """
+        Replaces every match of every pattern with a line break, one pattern after another
+        :param config: configuration text
+        :return: configuration without the matched default configuration
+        """
+        for pattern in self.patterns:
+            config = pattern.sub("\n", config)
+        return config
+
+    def matches_line(self, line: str) -> bool:
+        """
+        :param line: single line of the configuration
+        :return: True if any pattern matches at the beginning of the line
+        """
+        if self._any_pattern is not None:
+            return self._any_pattern.match(line) is not None
+        return any(pattern.match(line) is not None for pattern in self.patterns)
+
+    def matches_block(self, block: str) -> bool:
+        """
+        Used for patterns spanning a whole block, e.g. 'line aux 0\\n(.|\\n)*?\\n\\n'. Every pattern ends with the
+        line break of its matchlist line, so the block is matched with one more line break appended.
+        :param block: a block of the configuration (header, indented lines and the empty lines after it)
+        :return: True if any pattern matches the complete block
+        """
+        block += "\n"
+        if self._any_pattern is not None:
+            return self._any_pattern.fullmatch(block) is not None
+        return any(pattern.fullmatch(block) is not None for pattern in self.patterns)
+
+
+def load_matchlist(path: Path = MATCHLIST_PATH) -> Matchlist:
+    """
+    Returns the compiled matchlist of the given file. The file is only read and compiled again if it was modified
+    since the last call.
+    :param path: path of the matchlist file
+    :return: the compiled Matchlist
+    """
+    key = os.path.abspath(path)
+    mtime_ns = os.stat(key).st_mtime_ns
+    with _cache_lock:
+        matchlist = _cache.get(key)
+        if matchlist is None or matchlist.mtime_ns != mtime_ns:
+            with open(key, "r", encoding="utf-8") as f:
+                matchlist = Matchlist(f.readlines(), mtime_ns)
+            _cache[key] = matchlist
+            logger.info(f"MATCHLIST_LOADED path={path} patterns={len(matchlist)}")
+        return matchlist
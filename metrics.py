@@ -0,0 +1,182 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+METRICS_FILE_NAME = "metrics.json"
+PROMETHEUS_FILE_NAME = "metrics.prom"
+PROMETHEUS_PREFIX = "toporecover_"
+# name, help text and DeviceMetrics attribute of the metrics exported per device
+DEVICE_GAUGES = [
+    ("connect_seconds", "Seconds to open the session of the device", "connect_seconds"),
+    ("privileged_seconds", "Seconds from the open session to the privileged exec mode", "privileged_seconds"),
+    ("read_seconds", "Seconds to read the device including retries", "read_seconds"),
+    ("parse_seconds", "Seconds to parse the output of the device", "parse_seconds"),
+    ("read_attempts", "Attempts needed to read the device", "attempts"),
+]
+
+
+def _label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_label_value(value)}"' for key, value in labels.items()) + "}"
+
+
+class DeviceMetrics:
+    """
+    Durations and sizes measured while one device is read and parsed, None for a step that did not happen
+    """
+
+    def __init__(self, ip: str, port: str) -> None:
+        self.ip = ip
+        self.port = port
+        self.started = datetime.now().isoformat(timespec="seconds")
+        # 'read', 'failed', 'skipped' (circuit breaker open) or 'unreachable' (pre-scan)
+        self.status = None
+        self.attempts = 0
+        self.connect_seconds = None
+        self.privileged_seconds = None
+        self.read_seconds = None
+        self.parse_seconds = None
+        self.parsed = None
+        self.commands = []
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"DeviceMetrics({self.ip}:{self.port}, status={self.status}, commands={len(self.commands)})"
+
+    def record_command(self, command: str, seconds: float, size: int) -> None:
+        """
+        :param command: the answered command, a batch of commands is recorded as one command
+        :param seconds: time from sending the command until the answer was complete
+        :param size: size of the answer in characters
+        :return: None
+        """
+        with self._lock:
+            self.commands.append({"command": command.strip(), "seconds": round(seconds, 4), "bytes": size})
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            commands = list(self.commands)
+        return {
+            "ip": self.ip,
+            "port": self.port,
+            "started": self.started,
+            "status": self.status,
+            "attempts": self.attempts,
+            "connect_seconds": self.connect_seconds,
+            "privileged_seconds": self.privileged_seconds,
+            "read_seconds": self.read_seconds,
+            "parse_seconds": self.parse_seconds,
+            "parsed": self.parsed,
+            "bytes": sum(command["bytes"] for command in commands),
+            "commands": commands
+        }
+
+
+class RunMetrics:
+    """
+    Metrics of all devices of a run, written as metrics.json and in the Prometheus text format as metrics.prom to the
+    output folder. A device read again (e.g. by the daemon) replaces its previous metrics.
+    """
+
+    def __init__(self) -> None:
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._devices = {}
+
+    def __repr__(self) -> str:
+        return f"RunMetrics(started={self.started}, devices={len(self._devices)})"
+
+    def start_device(self, ip: str, port: str) -> DeviceMetrics:
+        """
+        :return: new metrics of a device that is read now
+        """
+        device = DeviceMetrics(ip, port)
+        with self._lock:
+            self._devices[f"{ip}:{port}"] = device
+        return device
+
+    def device(self, ip: str, port: str) -> DeviceMetrics | None:
+        """
+        :return: metrics of the latest read of the device, None if it was not read
+        """
+        with self._lock:
+            return self._devices.get(f"{ip}:{port}")
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            devices = list(self._devices.values())
+        return {
+            "started": self.started,
+            "seconds": round(time.perf_counter() - self._start, 3),
+            "devices": [device.to_dict() for device in devices]
+        }
+
+    def to_prometheus(self, data: dict = None) -> str:
+        """
+        :param data: metrics as returned by to_dict(), taken now if not given
+        :return: the metrics in the Prometheus text format, e.g. for the textfile collector of the node exporter
+        """
+        data = data if data is not None else self.to_dict()
+        lines = [f"# HELP {PROMETHEUS_PREFIX}run_seconds Seconds since the start of the run",
+                 f"# TYPE {PROMETHEUS_PREFIX}run_seconds gauge",
+                 f"{PROMETHEUS_PREFIX}run_seconds {data['seconds']}",
+                 f"# HELP {PROMETHEUS_PREFIX}device_up 1 if the device was read, 0 otherwise",
+                 f"# TYPE {PROMETHEUS_PREFIX}device_up gauge"]
+        for device in data["devices"]:
+            labels = _labels(ip=device["ip"], port=device["port"])
+            lines.append(f"{PROMETHEUS_PREFIX}device_up{labels} {int(device['status'] == 'read')}")
+        for name, help_text, key in DEVICE_GAUGES:
+            lines += [f"# HELP {PROMETHEUS_PREFIX}{name} {help_text}", f"# TYPE {PROMETHEUS_PREFIX}{name} gauge"]
+            for device in data["devices"]:
+                if device[key] is not None:
+                    lines.append(f"{PROMETHEUS_PREFIX}{name}{_labels(ip=device['ip'], port=device['port'])} "
+                                 f"{device[key]}")
+        # a command sent more than once to a device (e.g. by a retry) is summed up
+        totals = {}
+        for device in data["devices"]:
+            for command in device["commands"]:
+                total = totals.setdefault((device["ip"], device["port"], command["command"]), [0.0, 0])
+                total[0] += command["seconds"]
+                total[1] += command["bytes"]
+        for index, (name, help_text) in enumerate([("command_seconds", "Seconds until the command was answered"),
+                                                   ("command_bytes", "Size of the answer of the command")]):
+            lines += [f"# HELP {PROMETHEUS_PREFIX}{name} {help_text}", f"# TYPE {PROMETHEUS_PREFIX}{name} gauge"]
+            for (ip, port, command), total in totals.items():
+                value = round(total[index], 4) if index == 0 else total[index]
+                lines.append(f"{PROMETHEUS_PREFIX}{name}{_labels(ip=ip, port=port, command=command)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, output_dir: Path) -> None:
+        """
+        Writes metrics.json and metrics.prom, the old files are only replaced once the new ones are completely written
+        :param output_dir: folder the files are written to
+        :return: None
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        data = self.to_dict()
+        for name, content in [(METRICS_FILE_NAME, json.dumps(data, indent=2)),
+                              (PROMETHEUS_FILE_NAME, self.to_prometheus(data))]:
+            tmp_path = output_dir / (name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, output_dir / name)
+        logger.info(f"METRICS_SAVED path={output_dir / METRICS_FILE_NAME} devices={len(data['devices'])}")
@@ -6,18 +6,225 @@
 #  ______/_/\/_____/_/\/___\\_\______/_/\/______
 # _______\_\/______\_\/_____|_|______\_\/______
 
+import io
 import logging
 import re
 from pathlib import Path
 
+import config_tree
+import matchlist
+import raw_archive
+import snapshots
+
 logger = logging.getLogger(__name__)
 
 
-def parse(input_filename: Path, ip: str, port: int):
+# block headers that get an empty line in front of them while cleaning the running-config
+BLOCK_HEADER_PREFIXES = ("line", "interface", "router", "ip access-list")
+VTP_KEYS = ("VTP Operating Mode", "VTP version running", "VTP Domain Name", "VTP Password", "Configuration Revision")
+
+
+class RunningConfigCleaner:
+    """
+    Cleans the running-config line by line while it is read:
+
+    - comment lines ("!") are removed, a block of comment lines including the empty lines in front of it is replaced
+      by a single empty line (the first line is never removed)
+    - an empty line is inserted in front of every block header (line, interface, router, ip access-list)
+    - never more than one empty line follows another line
+
+    The result is the same as running the cleanup regexes over the whole running-config, but every line is only
+    touched once and no copies of the whole config are created.
+    """
+
+    def __init__(self) -> None:
+        self.lines = []
+        # whitespace and comment lines that are held back until it is known if they belong to a comment block
+        self._pending = []
+        self._last_comment = -1
+        self._first = True
+        self._newlines = 0
+
+    def feed(self, line: str) -> None:
+        """
+        :param line: next line of the running-config including its line break
+        """
+        if self._first:
+            self._first = False
+            self._emit(line)
+            return
+        if line.isspace():
+            self._pending.append(line)
+            return
+        if line.lstrip().startswith("!"):
+            self._pending.append(line)
+            self._last_comment = len(self._pending) - 1
+            return
+        self._flush()
+        self._emit(line)
+
+    def finish(self) -> str:
+        """
+        :return: the cleaned running-config
+        """
+        self._flush()
+        return "".join(self.lines)
+
+    def _flush(self) -> None:
+        if self._last_comment >= 0:
+            self._emit("\n")
+        # whitespace lines after the last comment are kept
+        for line in self._pending[self._last_comment + 1:]:
+            self._emit(line)
+        self._pending = []
+        self._last_comment = -1
+
+    def _emit(self, line: str) -> None:
+        if line.startswith(BLOCK_HEADER_PREFIXES):
+            self._append("\n")
+        self._append(line)
+
+    def _append(self, line: str) -> None:
+        # _newlines counts the line breaks at the end of the output, more than two in a row are dropped
+        if line == "\n":
+            if self._newlines >= 2:
+                return
+            self._newlines += 1
+        else:
+            self._newlines = 1
+        self.lines.append(line)
+
+
+class VlanScanner:
+    """
+    Collects the vlan commands from the lines of "show vlan brief", starting at the line it gets first.
+    Stops at the first vlan >= 1001, vlan 1 is skipped.
+    """
+
+    def __init__(self) -> None:
+        self.commands = []
+        self.error = None
+        self._stopped = False
+
+    def feed(self, line: str) -> None:
+        if self._stopped:
+            return
+        try:
+            if not line[0].isdigit() or line[0].isdigit() and int(line[:4].strip()) < 1001:
+                if line[0].isdigit() and int(line[:4].strip()) != 1:
+                    parts = line.split()  # split line at whitespace
+                    vlan_nummer = parts[0]
+                    vlan_name = parts[1]
+                    self.commands.append(f"vlan {vlan_nummer} \nname {vlan_name}\n")
+            else:
+                self._stopped = True
+        except (ValueError, IndexError) as e:
+            # raised when the vlan configuration is written, only if this scanner is the one that is used
+            self.error = e
+            self._stopped = True
+
+
+class VtpScanner:
+    """
+    Collects the "key: value" lines of "show vtp status" and "show vtp password" that are used for the configuration
+    """
+
+    def __init__(self) -> None:
+        self.entries = []
+
+    def feed(self, line: str) -> None:
+        if ":" in line:
+            parts = line.split(":", 1)
+            key = parts[0].strip()
+            if key in VTP_KEYS:
+                self.entries.append((key, parts[1].strip()))
+
+
+def parse_interface_status(line: str) -> tuple[str, str, str] | None:
+    """
+    Reads a row of "show ip interface brief", e.g.:
+
+    GigabitEthernet0/0     10.0.0.1        YES manual administratively down down
+
+    The columns are split at whitespace, so the result does not depend on the column widths of the device. Earlier
+    versions read the status 50 characters after the interface name, which is only right for the usual column widths,
+    see "Changes to the parsed output" in the README.
+    :param line: single line of the interface section
+    :return: (interface, status, protocol) or None if the line is not an interface row
+    """
+    parts = line.split()
+    # interface, ip address, ok?, method, status (may contain a space), protocol
+    if len(parts) < 5 or parts[2] not in ("YES", "NO"):
+        return None
+    if len(parts) == 5:
+        # the protocol column is missing if the end of the output was cut off
+        return parts[0], parts[4], ""
+    return parts[0], " ".join(parts[4:-1]), parts[-1]
+
+
+class RawConfig:
+    """
+    The parts of a raw output file that are needed for parsing, read in a single pass over the lines.
+    Only the running-config is kept, the vlan, vtp and interface lines are reduced while reading.
+    The interface section becomes a dict from interface name to (status, protocol).
+    """
+
+    def __init__(self, lines) -> None:
+        """
+        :param lines: iterable over the lines of a raw output file including their line breaks
+        :raise ValueError: if the running or the interface section is missing
+        """
+        cleaner = RunningConfigCleaner()
+        interfaces = {}
+        # without a vlan/vtp section the scan starts at the first line of the file, so both are scanned from the
+        # start until the section is found
+        vlan_scanner = VlanScanner()
+        vtp_scanner = VtpScanner()
+        vlan_found = vtp_found = end_run_found = interface_found = False
+        for index, line in enumerate(lines):
+            if not vlan_found and "** start vlan **" in line:
+                vlan_found = True
+                vlan_scanner = VlanScanner()
+            vlan_scanner.feed(line)
+            if vtp_found:
+                vtp_scanner.feed(line)
+            elif "** start vtp **" in line:
+                vtp_found = True
+                vtp_scanner = VtpScanner()
+            else:
+                vtp_scanner.feed(line)
+
+            if interface_found:
+                status = parse_interface_status(line)
+                if status is not None:
+                    interfaces[status[0]] = status[1:]
+            elif line == "** start interface **\n":
+                interface_found = True
+
+            if end_run_found:
+                continue
+            if line == "** end running **\n":
+                end_run_found = True
+            elif index > 0:
+                cleaner.feed(line)
+        if not end_run_found:
+            raise ValueError("VALUE_ERROR: '** end running **' not found in raw output")
+        if not interface_found:
+            raise ValueError("VALUE_ERROR: '** start interface **' not found in raw output")
+        self.running = cleaner.finish()
+        self.interfaces = interfaces
+        self.vlan = vlan_scanner
+        self.vtp = vtp_scanner
+
+
+def parse(input_filename: Path, ip: str, port: int, output_dir: Path = None):
     """
     :param input_filename: File containing the configuration that will be parsed
     :param ip: IP address of the device that was read
     :param port: The port used to access the device
+    :param output_dir: Directory the parsed configuration is written to, by default the path of the input file
+    without "raw_" is used (raw_output/x_raw_config.txt -> output/x_config.txt). The suffix of a compressed input
+    file is removed (x_raw_config.txt.gz -> x_config.txt)
 
     The code of the "parse" method parses a raw output file into a configuration that can be uploaded back onto a device exactly as it is
 
@@ -25,153 +232,142 @@ def parse(input_filename: Path, ip: str, port: int):
     For the switch, in addition to the running configuration of the device, the output of "show vlan brief", "show vtp status", "show vtp password", and "show ip interface brief" is also included
     For the final configuration, an output file is created that contains the resulting configuration
 
+    The raw output file is read once line by line, see RawConfig. Compressed raw output files are decompressed while
+    they are read, see raw_archive
+
     """
 
-    with open(input_filename, "r", encoding="utf-8") as f:
-        zeilen = f.readlines()  # list with all lines of the file
-    with open("settings/matchlist", "r", encoding="utf-8") as f:
-        std = f.readlines()
+    input_filename = Path(input_filename)
+    output_name = re.sub("raw_", "", raw_archive.strip_suffix(input_filename.name))
+    if output_dir is None:
+        output_path = Path(re.sub("raw_", "", str(input_filename.parent))) / output_name
+    else:
+        output_path = Path(output_dir) / output_name
+    with raw_archive.open_text(input_filename, "r") as raw:
+        parse_lines(raw, output_path, ip, port)
+
 
-    output_path = Path(re.sub("raw_", "", str(input_filename)))
+def parse_lines(lines, output_path: Path, ip: str, port: int, index: snapshots.SnapshotIndex = None) -> bool:
+    """
+    Parses raw output that is already in memory, e.g. the captured sections of a device, without reading a file
+    :param lines: iterable over the lines of the raw output including their line breaks
+    :param output_path: file the parsed configuration is written to
+    :param ip: IP address of the device that was read
+    :param port: The port used to access the device
+    :param index: if given, the configuration is only written if it changed since the last run, see SnapshotIndex
+    :return: True if the output file was written, False if the configuration was unchanged
+    """
+    # compiled once and shared by all parse calls, reloaded if the file changes
+    std = matchlist.load_matchlist()
+
+    raw_config = RawConfig(lines)
+    if index is not None:
+        # the configuration has to be complete before its hash is known
+        config = io.StringIO()
+        write_config(raw_config, std, config, ip, port)
+        return index.store(ip, port, output_path, config.getvalue())
     # automatically create output directory if it doesn't exist
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w") as f:
-        # -----------VLAN------------
-
-        # gets vlan numbers and names
-        vlan_start_index = 0
-        for index, line in enumerate(zeilen):  # enumerate returns both index and line
-            if re.search(r"\*\* start vlan \*\*", line):
-                vlan_start_index = index
-                break
-
-        # Code for cleaning up the running-config ...
-        end_run = zeilen.index("** end running **\n")
-        run = zeilen[1:end_run]
-        run = re.sub(r"\n{2,}", "\n\n", re.sub(r"^(((line)|(interface)|(router)|(ip access-list)).*)", r"\n\1",
-                                               re.sub(r"(([\n\r])\s*!.*)+", "\n", "".join(run), flags=re.M),
-                                               flags=re.M), flags=re.M)
-        run, grp = extract_groups(run)
-        for i in std:
-            run = re.sub("^\\s*" + i + "+", "\n", run, flags=re.M)
-        intc = "".join(zeilen[zeilen.index("** start interface **\n") + 1:])
-        if grp is not None:
-            for g in grp:
-                k=0
-                while k <len(g["lines"]):
-                    l= g["lines"][k]
-                    ls = l.strip()+"\n"
-                    k+=1
-                    if l.strip() == "":
-                        g["lines"].remove(l)
-                        k-=1
-                        continue
-                    for j in std:
-                         if re.match("^\\s*" + j + "+", ls, flags=re.M) is not None:
-                            g["lines"].remove(l)
-                            k-=1
-                            break
-                if g["header"].startswith("interface"):
-                    head = g["header"][10:]
-                    if intc[intc.index(head) + 50] == "u":
-                        g["lines"].append("no shutdown\n")
-                if len(g["lines"]) != 0:
-                    g["lines"].append("exit\n")
-                    run += g["header"] + "\n"
-                    run += "".join(g["lines"])
-        f.write(run)
-        del std
-        del intc
-        del run
-        del grp
-        logger.info(f"SUCCESS_RUN_CONFIG_PARSED_SUCCESSFUL", extra={'ip': ip, 'port': port})
-
-        # ------
-
-        found_vlan_config = False
-        # creates the vlan configuration part and writes it to the output file
-        for vlan_konfig_zeile in zeilen[vlan_start_index:]:
-            if not vlan_konfig_zeile[0].isdigit() or vlan_konfig_zeile[0].isdigit() and int(
-                    vlan_konfig_zeile[:4].strip()) < 1001:
-                if vlan_konfig_zeile[0].isdigit() and int(vlan_konfig_zeile[:4].strip()) != 1:
-                    parts = vlan_konfig_zeile.split()  # split line at whitespace
-                    vlan_nummer = parts[0]
-                    vlan_name = parts[1]
-                    f.write(f"vlan {vlan_nummer} \nname {vlan_name}\n")
-                    found_vlan_config = True
-            else:
-                break
-        if not found_vlan_config:
-            logger.warning("WARNING_NO_VLAN_CONFIG_RECEIVED", extra={'ip': ip, 'port': port})
+        write_config(raw_config, std, f, ip, port)
+    return True
+
+
+def write_config(raw_config: RawConfig, std: matchlist.Matchlist, f, ip: str, port: int) -> None:
+    """
+    Writes the configuration built from the read raw output to the output file
+    :param raw_config: the read raw output
+    :param std: matchlist with the default configuration that is removed
+    :param f: opened output file
+    :param ip: IP address of the device that was read
+    :param port: The port used to access the device
+    """
+    run, groups = extract_groups(raw_config.running)
+    run = std.sub(run)
+    for group in groups:
+        if std.matches_block(group.render()):
+            # the whole block is default configuration, e.g. the aux line of a router
+            lines = []
         else:
-            logger.info(f"SUCCESS_VLAN_CONFIG_PARSED_SUCCESSFUL", extra={'ip': ip, 'port': port})
-
-        # -----------VTP------------
-
-        # gets the start index of the vtp configuration
-        vtp_start_index = 0
-        for index, line in enumerate(zeilen):
-            if re.search(r"\*\* start vtp \*\*", line):
-                vtp_start_index = index + 1
-                break
-
-        write_konfig = False  # only write output if a configuration exists
-        vtp_commands_to_write = []  # list of all commands to write to the output file if 'write_konfig' is True
-
-        # parse the vtp configuration part
-        for vtp_konfig_zeile in zeilen[vtp_start_index:]:
-            if ":" in vtp_konfig_zeile:
-                parts = vtp_konfig_zeile.split(":", 1)
-                if parts[0].strip() == "VTP Operating Mode":
-                    vtp_commands_to_write.append(f"vtp mode {parts[1].strip()}\n")
-                elif parts[0].strip() == "VTP version running":
-                    vtp_commands_to_write.append(f"\nvtp version {parts[1].strip()}\n")
-                elif parts[0].strip() == "VTP Domain Name":
-                    vtp_commands_to_write.append(f"vtp domain {parts[1].strip()}\n")
-                elif parts[0].strip() == "VTP Password":
-                    vtp_commands_to_write.append(f"vtp password {parts[1].strip()}\n")
-                elif parts[0].strip() == "Configuration Revision":
-                    if int(parts[1].strip()) > 0:
-                        write_konfig = True
-                        logger.info(f"SUCCESS_VTP_CONFIG_PARSED_SUCCESSFUL", extra={'ip': ip, 'port': port})
-                    else:
-                        logger.warning(f"WARNING_NO_VTP_CONFIG_RECEIVED", extra={'ip': ip, 'port': port})
-        if write_konfig:  # if the variable is set to True, all elements from the list are written to the output file
-            f.writelines(vtp_commands_to_write)
-
-        logger.info(f"SUCCESS_OUTPUT_FILE_SAVED_SUCCESSFUL", extra={'ip': ip, 'port': port})
-
-
-GROUP_START_REGEXES = [#re.compile(r"^router\s+(ospf)|(rip)|(bgp)"),
+            # one pass over the block, keeping every line that is neither empty nor default configuration
+            lines = [line for line in group.child_lines()
+                     if line.strip() != "" and not std.matches_line(line.strip() + "\n")]
+        if group.header.startswith("interface"):
+            head = group.header[10:].strip()
+            # interfaces that are up are enabled again, interfaces missing in the section are left untouched
+            status = raw_config.interfaces.get(head)
+            if status is not None and status[0] == "up":
+                lines.append("no shutdown\n")
+        if len(lines) != 0:
+            lines.append("exit\n")
+            run += group.header + "\n"
+            run += "".join(lines)
+    f.write(run)
+    del run
+    del groups
+    logger.info(f"SUCCESS_RUN_CONFIG_PARSED_SUCCESSFUL", extra={'ip': ip, 'port': port})
+
+    # -----------VLAN------------
+
+    # creates the vlan configuration part and writes it to the output file
+    found_vlan_config = False
+    for vlan_command in raw_config.vlan.commands:
+        f.write(vlan_command)
+        found_vlan_config = True
+    if raw_config.vlan.error is not None:
+        raise raw_config.vlan.error
+    if not found_vlan_config:
+        logger.warning("WARNING_NO_VLAN_CONFIG_RECEIVED", extra={'ip': ip, 'port': port})
+    else:
+        logger.info(f"SUCCESS_VLAN_CONFIG_PARSED_SUCCESSFUL", extra={'ip': ip, 'port': port})
+
+    # -----------VTP------------
+
+    write_konfig = False  # only write output if a configuration exists
+    vtp_commands_to_write = []  # list of all commands to write to the output file if 'write_konfig' is True
+
+    # parse the vtp configuration part
+    for key, value in raw_config.vtp.entries:
+        if key == "VTP Operating Mode":
+            vtp_commands_to_write.append(f"vtp mode {value}\n")
+        elif key == "VTP version running":
+            vtp_commands_to_write.append(f"\nvtp version {value}\n")
+        elif key == "VTP Domain Name":
+            vtp_commands_to_write.append(f"vtp domain {value}\n")
+        elif key == "VTP Password":
+            vtp_commands_to_write.append(f"vtp password {value}\n")
+        elif key == "Configuration Revision":
+            if int(value) > 0:
+                write_konfig = True
+                logger.info(f"SUCCESS_VTP_CONFIG_PARSED_SUCCESSFUL", extra={'ip': ip, 'port': port})
+            else:
+                logger.warning(f"WARNING_NO_VTP_CONFIG_RECEIVED", extra={'ip': ip, 'port': port})
+    if write_konfig:  # if the variable is set to True, all elements from the list are written to the output file
+        f.writelines(vtp_commands_to_write)
+
+    logger.info(f"SUCCESS_OUTPUT_FILE_SAVED_SUCCESSFUL", extra={'ip': ip, 'port': port})
+
+
+GROUP_START_REGEXES = [re.compile(r"^router\s+\S+"),
                        re.compile(r"^interface .*"),
-                       #re.compile(r"^line (con)|(aux)|(vty) .*"),
-                       #re.compile(r"^ip access-list (extended)|(standard) .*"),
+                       re.compile(r"^line (con|aux|vty)\b.*"),
+                       re.compile(r"^ip access-list (extended|standard) .*"),
                        ]
 
 
-def extract_groups(run: str):
-    lines = run.splitlines(keepends=True)
+def extract_groups(run: str) -> tuple[str, list[config_tree.ConfigNode]]:
+    """
+    Splits the running-config into the blocks that are cleaned line by line (router, interface, line and
+    ip access-list blocks) and the rest of the config
+    :param run: the cleaned running-config
+    :return: the running-config without these blocks and the blocks in the order of the config
+    """
     groups = []
     clean_lines = []
-    current_group = None
-    for line in lines:
-        stripped = line.rstrip("\n")
-        if any(r.match(stripped) for r in GROUP_START_REGEXES):
-            current_group = {"header": stripped, "lines": [""]}
-            continue
-        if current_group:
-            if stripped.strip() == "":
-                current_group["lines"].append(line)
-                continue
-            if stripped.startswith(" "):
-                current_group["lines"].append(line)
-                continue
-            groups.append(current_group)
-            current_group = None
-            clean_lines.append(line)
-            continue
-        clean_lines.append(line)
-    if current_group:
-        groups.append(current_group)
+    for node in config_tree.build_tree(run).children or ():
+        if any(r.match(node.header) for r in GROUP_START_REGEXES):
+            groups.append(node)
+        else:
+            clean_lines.extend(node.lines())
     clean_run = "".join(clean_lines)
     return clean_run, groups
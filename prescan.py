@@ -0,0 +1,70 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 2
+# connections opened at the same time, stays below the file descriptor limits of the common platforms
+MAX_CONCURRENT = 256
+
+
+async def _check(ip: str, port: str, timeout: float, slots: asyncio.Semaphore) -> str | None:
+    """
+    Opens a plain TCP connection to the endpoint and closes it again right away
+    :return: None if the endpoint accepted the connection, the error otherwise
+    """
+    async with slots:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(ip, int(port)), timeout)
+        except asyncio.TimeoutError:
+            return f"no answer within {timeout}s"
+        except OSError as e:
+            return str(e)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return None
+
+
+async def _scan(endpoints: list[tuple[str, str]], timeout: float, concurrency: int) -> list[str | None]:
+    slots = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(_check(ip, port, timeout, slots) for ip, port in endpoints))
+
+
+def scan(endpoints: list[tuple[str, str]], timeout: float = DEFAULT_TIMEOUT,
+         concurrency: int = MAX_CONCURRENT) -> tuple[list[tuple[str, str]], dict[tuple[str, str], str]]:
+    """
+    Checks which endpoints accept a TCP connection, all endpoints at the same time. An unreachable endpoint costs at
+    most the short timeout of the scan instead of the connect timeout of a whole session.
+    :param endpoints: list of (ip, port) tuples
+    :param timeout: seconds an endpoint has to accept the connection
+    :param concurrency: maximum number of connections opened at the same time
+    :return: the reachable endpoints in the given order and the error of every unreachable endpoint
+    """
+    if not isinstance(timeout, (int, float)) or timeout <= 0:
+        raise ValueError(f"VALUE_ERROR: timeout must be a positive number -> currently: {timeout}")
+    if not isinstance(concurrency, int) or concurrency < 1:
+        raise ValueError(f"VALUE_ERROR: concurrency must be a positive integer -> currently: {concurrency}")
+    start = time.perf_counter()
+    errors = asyncio.run(_scan(endpoints, timeout, concurrency)) if endpoints else []
+    reachable = []
+    unreachable = {}
+    for endpoint, error in zip(endpoints, errors):
+        if error is None:
+            reachable.append(endpoint)
+        else:
+            unreachable[endpoint] = error
+    logger.info(f"PRESCAN_FINISHED endpoints={len(endpoints)} reachable={len(reachable)} "
+                f"unreachable={len(unreachable)} seconds={time.perf_counter() - start:.2f}")
+    return reachable, unreachable
@@ -0,0 +1,143 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import cProfile
+import logging
+import pstats
+import re
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = Path("logs/profiles")
+TOP_FUNCTIONS = 15
+# the self time of every function counts into the first category whose pattern matches 'file:function'
+CATEGORIES = [
+    ("regex", re.compile(r"re\.Pattern|_sre|[/\\]re[/\\]")),
+    ("sleep", re.compile(r"time\.sleep|asyncio[/\\]tasks\.py:\d+\(sleep\)")),
+    ("socket wait", re.compile(r"_socket\.socket|select|poll|selectors\.py|telnetlib")),
+    ("file io", re.compile(r"_io\.|gzip\.py|lzma\.py|bz2\.py|zstd|os\.replace")),
+    ("logging", re.compile(r"[/\\]logging[/\\]")),
+]
+
+
+def phase(profiler: "PhaseProfiler | None", name: str):
+    """
+    :param profiler: profiler of the run, None if the run is not profiled
+    :param name: name of the phase
+    :return: context manager profiling the phase, does nothing without a profiler
+    """
+    return profiler.phase(name) if profiler is not None else nullcontext()
+
+
+def _function_name(key: tuple) -> str:
+    filename, line, function = key
+    if filename == "~":
+        return function
+    path = Path(filename)
+    # a package is named by its folder, e.g. 're/__init__.py'
+    name = f"{path.parent.name}/{path.name}" if path.name == "__init__.py" else path.name
+    return f"{name}:{line}({function})"
+
+
+class PhaseProfiler:
+    """
+    Profiles the phases of a run (e.g. reader, parser, upload) separately with cProfile. The profiler covers every
+    thread of the process (Python 3.12 or newer), the stats of a phase run more than once are merged. write() stores
+    the stats of every phase as .prof file, which can be opened with pstats or tools like snakeviz, and a short
+    summary of the hot spots.
+    """
+
+    def __init__(self, directory: Path = PROFILE_DIR) -> None:
+        """
+        :param directory: folder the stats files and the summary are written to
+        """
+        self._directory = Path(directory)
+        self._stamp = datetime.now().strftime("%Y_%m_%d-%H_%M_%S")
+        self._stats = {}
+        self._seconds = {}
+
+    def __repr__(self) -> str:
+        return f"PhaseProfiler({self._directory}, phases={list(self._stats)})"
+
+    @property
+    def phases(self) -> list[str]:
+        return list(self._stats)
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Context manager profiling everything run inside it as the given phase
+        :param name: name of the phase, e.g. 'reader'
+        """
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # e.g. the tool itself runs under 'python -m cProfile', only one profiler can be active
+            logger.warning(f"WARNING_PROFILE_UNAVAILABLE phase={name} error={e}")
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._seconds[name] = self._seconds.get(name, 0.0) + time.perf_counter() - start
+            if name in self._stats:
+                self._stats[name].add(profile)
+            else:
+                self._stats[name] = pstats.Stats(profile)
+            logger.info(f"PROFILE_PHASE_FINISHED phase={name} seconds={self._seconds[name]:.3f}")
+
+    def _stats_path(self, name: str) -> Path:
+        return self._directory / f"{self._stamp}_{name}.prof"
+
+    def summary(self) -> str:
+        """
+        :return: per phase the wall time, the self time per category and the functions with the most self time
+        """
+        lines = []
+        for name, stats in self._stats.items():
+            lines.append(f"phase {name}: {self._seconds[name]:.3f}s wall, {stats.total_tt:.3f}s profiled, "
+                         f"stats: {self._stats_path(name)}")
+            total = max(stats.total_tt, 1e-9)
+            categories = {category: 0.0 for category, _ in CATEGORIES}
+            for key, (_, _, self_time, _, _) in stats.stats.items():
+                text = f"{key[0]}:{key[2]}"
+                for category, pattern in CATEGORIES:
+                    if pattern.search(text):
+                        categories[category] += self_time
+                        break
+            lines.append("  self time by category:")
+            for category, seconds in sorted(categories.items(), key=lambda item: -item[1]):
+                lines.append(f"    {category:<12} {seconds:9.3f}s {100 * seconds / total:5.1f}%")
+            lines.append(f"  top {TOP_FUNCTIONS} functions by self time:")
+            lines.append(f"    {'self':>9}  {'cumulative':>10}  {'calls':>9}  function")
+            top = sorted(stats.stats.items(), key=lambda item: -item[1][2])[:TOP_FUNCTIONS]
+            for key, (_, calls, self_time, cumulative, _) in top:
+                lines.append(f"    {self_time:8.3f}s  {cumulative:9.3f}s  {calls:9d}  {_function_name(key)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> str:
+        """
+        Writes the stats file of every phase and the summary
+        :return: the summary
+        """
+        self._directory.mkdir(parents=True, exist_ok=True)
+        for name, stats in self._stats.items():
+            stats.dump_stats(self._stats_path(name))
+        summary = self.summary()
+        summary_path = self._directory / f"{self._stamp}_summary.txt"
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(summary)
+        logger.info(f"PROFILE_SAVED path={summary_path} phases={self.phases}")
+        return summary
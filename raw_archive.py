@@ -0,0 +1,70 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import bz2
+import gzip
+import lzma
+from pathlib import Path
+
+# compression name -> (file suffix, open function), every codec reads files of several appended streams as one
+COMPRESSIONS = {
+    "gzip": (".gz", gzip.open),
+    "xz": (".xz", lzma.open),
+    "bz2": (".bz2", bz2.open)
+}
+try:
+    # part of the standard library since python 3.14
+    from compression import zstd
+
+    COMPRESSIONS["zstd"] = (".zst", zstd.open)
+except ImportError:
+    pass
+
+SUFFIXES = tuple(suffix for suffix, _ in COMPRESSIONS.values())
+
+
+def archive_name(file_name: str, compression: str = None) -> str:
+    """
+    :param file_name: name of the uncompressed raw output file
+    :param compression: name of the compression, None for no compression
+    :return: file name with the suffix of the compression
+    """
+    if compression is None:
+        return file_name
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"VALUE_ERROR: compression must be one of {list(COMPRESSIONS)} -> currently: {compression}")
+    return file_name + COMPRESSIONS[compression][0]
+
+
+def strip_suffix(file_name: str) -> str:
+    """
+    :param file_name: name of a raw output file, compressed or not
+    :return: the name without the suffix of the compression
+    """
+    for suffix in SUFFIXES:
+        if file_name.endswith(suffix):
+            return file_name[:-len(suffix)]
+    return file_name
+
+
+def open_text(path: Path, mode: str = "r"):
+    """
+    Opens a raw output file in text mode. Compressed files are recognised by their suffix and (de)compressed while
+    they are read or written, so they are never held in memory as a whole.
+    In append mode every call adds a new compressed stream to the file, so sections can be written as they arrive.
+    :param path: path of the file
+    :param mode: 'r', 'w' or 'a'
+    :return: the opened file
+    """
+    path = Path(path)
+    for suffix, open_function in COMPRESSIONS.values():
+        if path.name.endswith(suffix):
+            return open_function(path, mode + "t", encoding="utf-8")
+    if mode == "r":
+        return open(path, mode, encoding="utf-8")
+    return open(path, mode)
@@ -0,0 +1,177 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import snapshots
+from confer import Confer
+from limiter import ConnectionLimiter
+from timing import TimingStore
+
+logger = logging.getLogger(__name__)
+
+# name of a parsed configuration, e.g. 10.0.0.1_5000-2026_01_01-10_00_00_config.txt
+CONFIG_FILE_PATTERN = re.compile(r"((\d{1,3}\.){3}\d{1,3})_(\d{4,5})-\d{4}(_\d{2}){2}-(\d{2}_){3}config\.txt$")
+VTP_MODE_PATTERN = re.compile(r"^vtp mode (\S+)", re.MULTILINE | re.IGNORECASE)
+
+# the devices of a wave are restored in parallel, the next wave starts once every device of the wave is finished.
+# VTP servers come first, so the clients learn the vlans from a server that is already configured.
+WAVES = ["vtp servers", "other devices", "vtp clients"]
+WAVE_VTP_SERVER = 0
+WAVE_OTHER = 1
+WAVE_VTP_CLIENT = 2
+
+
+class RestoreJob:
+    """
+    Upload of the latest configuration of one device of the inventory
+    """
+
+    def __init__(self, ip: str, port: str, props: dict, config_file: Path, wave: int) -> None:
+        """
+        :param ip: IP address of the device
+        :param port: port of the device
+        :param props: properties of the device in reader_settings.json
+        :param config_file: parsed configuration that is uploaded
+        :param wave: index into WAVES
+        """
+        self.ip = ip
+        self.port = port
+        self.props = props
+        self.config_file = config_file
+        self.wave = wave
+
+    def __repr__(self) -> str:
+        return f"RestoreJob({self.ip}:{self.port}, file={self.config_file.name}, wave={WAVES[self.wave]})"
+
+
+def find_latest_configs(output_dir: Path) -> dict[tuple[str, str], Path]:
+    """
+    Finds the latest parsed configuration of every device. The snapshot index knows the latest file of every device,
+    devices missing in the index use their newest file by name (the names contain the time they were read).
+    :param output_dir: output folder with the parsed configurations
+    :return: (ip, port) -> path of the latest configuration
+    """
+    latest = {}
+    for path in sorted(output_dir.glob("*_config.txt")):
+        match = CONFIG_FILE_PATTERN.match(path.name)
+        if match:
+            latest[(match.group(1), match.group(3))] = path
+    index = snapshots.SnapshotIndex(output_dir)
+    index.load()
+    for key, entry in index.entries.items():
+        path = output_dir / entry.get("file", "")
+        if entry.get("file") and path.exists():
+            ip, port = key.rsplit(":", 1)
+            latest[(ip, port)] = path
+    return latest
+
+
+def restore_wave(config_file: Path) -> int:
+    """
+    :param config_file: parsed configuration of a device
+    :return: wave the device is restored in, depending on its VTP mode
+    """
+    with open(config_file, "r", encoding="utf-8") as f:
+        match = VTP_MODE_PATTERN.search(f.read())
+    if match is None:
+        return WAVE_OTHER
+    mode = match.group(1).lower()
+    if mode == "server":
+        return WAVE_VTP_SERVER
+    if mode == "client":
+        return WAVE_VTP_CLIENT
+    return WAVE_OTHER
+
+
+def plan_restore(devices: dict, output_dir: Path) -> list[list[RestoreJob]]:
+    """
+    Maps the latest configuration in the output folder to every device of the inventory. Devices without a
+    configuration and configurations of devices missing in the inventory are skipped.
+    :param devices: devices section of reader_settings.json
+    :param output_dir: output folder with the parsed configurations
+    :return: the jobs of every wave in the order of WAVES, a wave may be empty
+    """
+    latest = find_latest_configs(output_dir)
+    waves = [[] for _ in WAVES]
+    for ip in devices:
+        for port, props in devices[ip].items():
+            config_file = latest.pop((ip, port), None)
+            if config_file is None:
+                logger.warning(f"RESTORE_NO_CONFIG ip={ip} port={port} skipped")
+                continue
+            job = RestoreJob(ip, port, props, config_file, restore_wave(config_file))
+            waves[job.wave].append(job)
+    for ip, port in latest:
+        logger.warning(f"RESTORE_NOT_IN_INVENTORY ip={ip} port={port} skipped")
+    return waves
+
+
+def upload(job: RestoreJob, batch_size: int, limiter: ConnectionLimiter,
+           timings: TimingStore = None) -> list[tuple[int, str]] | None:
+    """
+    Uploads the configuration of one device, errors are logged so one failing device never affects the others
+    :param job: device and configuration
+    :param batch_size: see Confer
+    :param limiter: connection limiter shared by all uploads
+    :param timings: measured timing of the devices, see timing.TimingStore
+    :return: the failed commands (see Confer.send_cmds), None if the upload failed
+    """
+    props = job.props
+    profile = timings.profile(job.ip, job.port) if timings is not None else None
+    try:
+        confer = Confer(str(job.config_file), props["device_ios"], job.ip, int(job.port), props["username"],
+                        props["password"], props.get("secret"), limiter, batch_size, profile)
+        failed = confer.send_cmds()
+    except Exception as e:
+        logger.error(f"RESTORE_DEVICE_ERROR ip={job.ip} port={job.port} error={e}")
+        print(f"\033[31mRESTORE_DEVICE_ERROR ip={job.ip} port={job.port} error={e}\033[0m")
+        return None
+    logger.info(f"RESTORE_DEVICE_FINISHED ip={job.ip} port={job.port} file={job.config_file.name} "
+                f"failed_commands={len(failed)}")
+    return failed
+
+
+def restore_topology(devices: dict, output_dir: Path, workers: int = 1, batch_size: int = 1,
+                     limiter: ConnectionLimiter = None) -> dict:
+    """
+    Uploads the latest configuration of every device of the inventory, wave after wave (see WAVES), up to
+    `workers` devices of a wave at the same time
+    :param devices: devices section of reader_settings.json
+    :param output_dir: output folder with the parsed configurations
+    :param workers: number of devices restored at the same time
+    :param batch_size: see Confer
+    :param limiter: connection limits per host, e.g. ConfigReader.limiter
+    :return: statistics of the restore: devices, restored, failed (devices), failed_commands, seconds
+    """
+    limiter = limiter if limiter is not None else ConnectionLimiter()
+    waves = plan_restore(devices, output_dir)
+    timings = TimingStore(output_dir)
+    timings.load()
+    stats = {"devices": sum(len(jobs) for jobs in waves), "restored": 0, "failed": 0, "failed_commands": 0,
+             "seconds": 0.0}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="restore") as pool:
+        for name, jobs in zip(WAVES, waves):
+            if not jobs:
+                continue
+            logger.info(f"RESTORE_WAVE_START wave='{name}' devices={len(jobs)} workers={workers}")
+            for result in pool.map(lambda job: upload(job, batch_size, limiter, timings), jobs):
+                if result is None:
+                    stats["failed"] += 1
+                else:
+                    stats["restored"] += 1
+                    stats["failed_commands"] += len(result)
+            logger.info(f"RESTORE_WAVE_FINISHED wave='{name}'")
+    timings.save()
+    stats["seconds"] = time.perf_counter() - start
+    return stats
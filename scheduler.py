@@ -0,0 +1,235 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import heapq
+import itertools
+import logging
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# fraction of its interval a run of a device is delayed at most
+DEFAULT_JITTER = 0.1
+MAX_JITTER = 0.5
+
+
+def device_intervals(devices: dict, schedule: dict, default_interval: float) -> list[tuple[str, str, float]]:
+    """
+    Resolves the collection interval of every device, the most specific setting wins: the 'interval' of the device,
+    the interval of its host in schedule['hosts'], the interval of its device type in schedule['device_types'] and
+    at last the default interval.
+    :param devices: devices section of reader_settings.json
+    :param schedule: optional schedule section of reader_settings.json
+    :param default_interval: seconds between two reads of a device without a configured interval
+    :return: list of (ip, port, interval) tuples in inventory order
+    """
+    hosts = schedule.get("hosts", {})
+    device_types = schedule.get("device_types", {})
+    intervals = []
+    for ip in devices:
+        for port, props in devices[ip].items():
+            interval = props.get("interval", hosts.get(ip, device_types.get(props["device_type"], default_interval)))
+            intervals.append((ip, port, interval))
+    return intervals
+
+
+class ScheduledDevice:
+    """
+    Schedule state of one device
+    """
+
+    def __init__(self, ip: str, port: str, interval: float) -> None:
+        self.ip = ip
+        self.port = port
+        self.interval = interval
+        # planned start without jitter, the jitter is added to every run on its own, so it never accumulates
+        self.base = 0.0
+        self.next_run = 0.0
+        self.running = False
+        # True if the device was made due by trigger(), the run does not move the regular schedule
+        self.triggered = False
+        self.runs = 0
+        self.skipped = 0
+        self.last_duration = None
+
+    def __repr__(self) -> str:
+        return f"ScheduledDevice({self.ip}:{self.port}, interval={self.interval}, runs={self.runs})"
+
+
+class CollectionScheduler:
+    """
+    Reads every device at its own interval instead of the whole inventory at once. The first runs are spread evenly
+    over the interval of every device, with the hosts interleaved, and every run is delayed by a random jitter, so
+    the devices do not fall back into step. At most max_concurrent devices are read at the same time, due devices
+    wait for a free slot. The connection limits per host of the config reader still apply on top.
+    A device that is still being read when it is due again is skipped until its next run.
+    """
+
+    def __init__(self, read_device: Callable[[str, str], object], devices: list[tuple[str, str, float]],
+                 max_concurrent: int = 1, jitter: float = DEFAULT_JITTER, seed: int = None) -> None:
+        """
+        :param read_device: function reading and handing over one device, e.g. ConfigReader.read_device
+        :param devices: list of (ip, port, interval) tuples, see device_intervals()
+        :param max_concurrent: maximum number of devices read at the same time
+        :param jitter: random delay of every run as fraction of the interval of the device, 0 for no jitter
+        :param seed: seed of the jitter, None for a random one
+        """
+        if not devices:
+            raise ValueError("VALUE_ERROR: no devices to schedule")
+        for ip, port, interval in devices:
+            if not isinstance(interval, (int, float)) or interval <= 0:
+                raise ValueError(f"VALUE_ERROR: interval of {ip}:{port} must be a positive number "
+                                 f"-> currently: {interval}")
+        if not isinstance(max_concurrent, int) or max_concurrent < 1:
+            raise ValueError(f"VALUE_ERROR: max_concurrent must be a positive integer -> currently: {max_concurrent}")
+        if not isinstance(jitter, (int, float)) or not 0 <= jitter <= MAX_JITTER:
+            raise ValueError(f"VALUE_ERROR: jitter must be a number between 0 and {MAX_JITTER} -> currently: {jitter}")
+        self._read_device = read_device
+        self._devices = [ScheduledDevice(ip, port, interval) for ip, port, interval in devices]
+        self._max_concurrent = max_concurrent
+        self._jitter = jitter
+        self._random = random.Random(seed)
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._heap = []
+        # tie breaker of the heap, devices are never compared
+        self._sequence = itertools.count()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    def __repr__(self) -> str:
+        return (f"CollectionScheduler(devices={len(self._devices)}, max_concurrent={self._max_concurrent}, "
+                f"jitter={self._jitter})")
+
+    def _push(self, device: ScheduledDevice) -> None:
+        device.next_run = device.base + self._random.uniform(0, self._jitter) * device.interval
+        heapq.heappush(self._heap, (device.next_run, next(self._sequence), device))
+
+    def _spread(self, start: float) -> None:
+        """
+        Plans the first run of every device. The hosts are interleaved, so consecutive runs go to different hosts.
+        :param start: monotonic time of the first run
+        """
+        by_host = {}
+        for device in self._devices:
+            by_host.setdefault(device.ip, []).append(device)
+        order = [device for devices in itertools.zip_longest(*by_host.values()) for device in devices
+                 if device is not None]
+        for position, device in enumerate(order):
+            device.base = start + device.interval * position / len(order)
+            self._push(device)
+
+    def _reschedule(self, device: ScheduledDevice, now: float) -> None:
+        if not device.triggered:
+            device.base += device.interval
+        device.triggered = False
+        if device.base < now:
+            # missed runs (e.g. while waiting for a free slot) are not made up, the device keeps its place
+            device.base += math.ceil((now - device.base) / device.interval) * device.interval
+        self._push(device)
+
+    def _run_device(self, device: ScheduledDevice) -> None:
+        start = time.monotonic()
+        try:
+            self._read_device(device.ip, device.port)
+        except Exception as e:
+            # read_device handles the errors of the device itself, this only keeps the slot from being lost
+            logger.error(f"SCHEDULE_READ_ERROR ip={device.ip} port={device.port} error={e}", exc_info=True)
+        finally:
+            with self._lock:
+                device.running = False
+                device.runs += 1
+                device.last_duration = round(time.monotonic() - start, 3)
+            self._slots.release()
+
+    def trigger(self) -> None:
+        """
+        Makes every device due now, the regular schedule of the devices is kept
+        :return: None
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._heap = []
+            for device in self._devices:
+                device.triggered = True
+                device.next_run = now
+                self._heap.append((now, next(self._sequence), device))
+            heapq.heapify(self._heap)
+        logger.info(f"SCHEDULE_TRIGGERED devices={len(self._devices)}")
+        self._wake.set()
+
+    def stop(self) -> None:
+        """
+        Stops run() once the devices being read are finished
+        :return: None
+        """
+        self._stop.set()
+        self._wake.set()
+
+    def run(self) -> None:
+        """
+        Reads the devices as they are due until stop() is called
+        :return: None
+        """
+        logger.info(f"SCHEDULER_STARTED devices={len(self._devices)} max_concurrent={self._max_concurrent} "
+                    f"jitter={self._jitter}")
+        with self._lock:
+            self._spread(time.monotonic())
+        with ThreadPoolExecutor(max_workers=self._max_concurrent, thread_name_prefix="scheduler") as executor:
+            while not self._stop.is_set():
+                with self._lock:
+                    delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._wake.wait(delay)
+                    self._wake.clear()
+                    continue
+                # the due devices stay in the heap until a slot is free, the timeout only checks for stop()
+                if not self._slots.acquire(timeout=1):
+                    continue
+                with self._lock:
+                    _, _, device = heapq.heappop(self._heap)
+                    self._reschedule(device, time.monotonic())
+                    skip = device.running
+                    if skip:
+                        device.skipped += 1
+                    else:
+                        device.running = True
+                if skip:
+                    self._slots.release()
+                    logger.warning(f"SCHEDULE_OVERRUN ip={device.ip} port={device.port} still being read, "
+                                   f"skipped until the next run")
+                    continue
+                logger.debug(f"SCHEDULE_DEVICE_DUE ip={device.ip} port={device.port}")
+                executor.submit(self._run_device, device)
+        logger.info("SCHEDULER_STOPPED")
+
+    def status(self) -> dict:
+        """
+        :return: number of devices being read and the schedule state of every device
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "running": sum(device.running for device in self._devices),
+                "max_concurrent": self._max_concurrent,
+                "devices": [{
+                    "ip": device.ip,
+                    "port": device.port,
+                    "interval": device.interval,
+                    "running": device.running,
+                    "runs": device.runs,
+                    "skipped": device.skipped,
+                    "next_run_in_seconds": round(max(0.0, device.next_run - now), 1),
+                    "last_duration_seconds": device.last_duration
+                } for device in self._devices]
+            }
@@ -0,0 +1,228 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+import connector
+
+logger = logging.getLogger(__name__)
+
+
+class PooledSession:
+    """
+    An authenticated session to one device that is kept open between collections
+    """
+
+    def __init__(self, ip: str, port: str) -> None:
+        self.ip = ip
+        self.port = port
+        self.connection = None
+        # only one thread may use the session at a time, the keepalive skips sessions that are in use
+        self.lock = threading.Lock()
+        self.last_used = 0.0
+        self.opened = 0
+        # True if the session was already used before, False if it was just opened
+        self.reused = False
+        # True while the connection is being opened, counts as open for the limit of the host
+        self.opening = False
+
+    def __repr__(self) -> str:
+        return f"PooledSession({self.ip}:{self.port}, alive={self.connection is not None}, opened={self.opened})"
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.disconnect()
+            self.connection = None
+
+
+class SessionPool:
+    """
+    Keeps one authenticated session (logged in and in privileged exec mode) per device open, so repeated collections
+    do not have to connect, log in and enable again. Idle sessions are kept alive by sending an empty line, dead
+    sessions are opened again the next time they are used. With a limit per host, the least recently used idle
+    session of the host is closed before a new one is opened, so the pool never keeps more sessions to a host open.
+    """
+
+    def __init__(self, keepalive_interval: float = 60) -> None:
+        """
+        :param keepalive_interval: seconds a session may be idle before a keepalive is sent
+        """
+        if not isinstance(keepalive_interval, (int, float)) or keepalive_interval <= 0:
+            raise ValueError(f"VALUE_ERROR: keepalive_interval must be a positive number "
+                             f"-> currently: {keepalive_interval}")
+        self._keepalive_interval = keepalive_interval
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._keepalive_thread = None
+
+    def __repr__(self) -> str:
+        return f"SessionPool(sessions={len(self._sessions)}, keepalive_interval={self._keepalive_interval})"
+
+    def _get(self, ip: str, port: str) -> PooledSession:
+        with self._lock:
+            key = (ip, port)
+            if key not in self._sessions:
+                self._sessions[key] = PooledSession(ip, port)
+            return self._sessions[key]
+
+    def _make_room(self, session: PooledSession, max_per_host: int | None) -> None:
+        """
+        Waits until the host of the session has room for one more open session, closing the least recently used idle
+        sessions of the host. The room is reserved by setting session.opening.
+        :param session: session that is opened next, its lock is held by the caller
+        :param max_per_host: maximum number of open sessions per host, None for no limit
+        :return: None
+        """
+        waiting = False
+        while True:
+            with self._lock:
+                others = [other for other in self._sessions.values() if other.ip == session.ip and other is not session
+                          and (other.connection is not None or other.opening)]
+                if max_per_host is None or len(others) < max_per_host:
+                    session.opening = True
+                    return
+                idle = sorted((other for other in others if other.connection is not None),
+                              key=lambda other: other.last_used)
+            for other in idle:
+                # a session in use is never waited for here, it is freed once its read is finished
+                if not other.lock.acquire(blocking=False):
+                    continue
+                try:
+                    other.close()
+                finally:
+                    other.lock.release()
+                logger.info(f"SESSION_EVICTED ip={other.ip} port={other.port} max_per_host={max_per_host}")
+                break
+            else:
+                if not waiting:
+                    logger.info(f"CONNECTION_LIMIT_REACHED host={session.ip} waiting for a pooled session to be freed")
+                    waiting = True
+                time.sleep(0.1)
+
+    @contextmanager
+    def session(self, ip: str, port: str, open_session: Callable[[str, str], connector.Connector],
+                max_per_host: int = None):
+        """
+        Context manager that returns the open session of the device, the session is opened first if there is none or
+        if it was closed. If an error occurs while the session is used, the session is closed, because its state is
+        unknown afterward.
+        :param ip: IP address of the device
+        :param port: port of the device
+        :param open_session: function returning a new connector for the device, already in privileged exec mode
+        :param max_per_host: maximum number of sessions the pool keeps open to the IP address, None for no limit
+        """
+        session = self._get(ip, port)
+        with session.lock:
+            session.reused = session.connection is not None and session.connection.is_alive()
+            if not session.reused:
+                if session.connection is not None:
+                    logger.warning(f"SESSION_LOST ip={ip} port={port} reconnecting")
+                    session.close()
+                self._make_room(session, max_per_host)
+                try:
+                    session.connection = open_session(ip, port)
+                finally:
+                    session.opening = False
+                session.opened += 1
+                logger.info(f"SESSION_OPENED ip={ip} port={port} opened={session.opened}")
+            try:
+                yield session
+            except Exception:
+                session.close()
+                raise
+            finally:
+                session.last_used = time.monotonic()
+
+    def keepalive(self) -> None:
+        """
+        Sends a keepalive over every idle session that is not in use, closes the sessions that do not answer
+        :return: None
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+        now = time.monotonic()
+        for session in sessions:
+            if session.connection is None or now - session.last_used < self._keepalive_interval:
+                continue
+            if not session.lock.acquire(blocking=False):
+                continue
+            try:
+                session.connection.keepalive()
+                session.last_used = time.monotonic()
+            except Exception as e:
+                logger.warning(f"SESSION_KEEPALIVE_FAILED ip={session.ip} port={session.port} error={e}")
+                session.close()
+            finally:
+                session.lock.release()
+
+    def _keepalive_loop(self) -> None:
+        while not self._stop.wait(self._keepalive_interval / 2):
+            self.keepalive()
+
+    def start(self) -> None:
+        """
+        Starts the background thread sending the keepalives
+        :return: None
+        """
+        if self._keepalive_thread is not None:
+            return
+        self._stop.clear()
+        self._keepalive_thread = threading.Thread(target=self._keepalive_loop, name="session_keepalive", daemon=True)
+        self._keepalive_thread.start()
+
+    def retain(self, devices: list) -> None:
+        """
+        Closes the sessions of all devices that are not in the given list, e.g. devices removed from the settings
+        :param devices: list of (ip, port) tuples
+        :return: None
+        """
+        keep = set(devices)
+        with self._lock:
+            removed = [self._sessions.pop(key) for key in list(self._sessions) if key not in keep]
+        for session in removed:
+            with session.lock:
+                session.close()
+            logger.info(f"SESSION_CLOSED ip={session.ip} port={session.port} device removed")
+
+    def status(self) -> list[dict]:
+        """
+        :return: one dict per device with the state of its session
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+        now = time.monotonic()
+        return [{
+            "ip": session.ip,
+            "port": session.port,
+            "alive": session.connection is not None,
+            "in_use": session.lock.locked(),
+            "idle_seconds": round(now - session.last_used, 1) if session.last_used else None,
+            "opened": session.opened
+        } for session in sessions]
+
+    def close(self) -> None:
+        """
+        Stops the keepalive thread and closes all sessions
+        :return: None
+        """
+        self._stop.set()
+        if self._keepalive_thread is not None:
+            self._keepalive_thread.join()
+            self._keepalive_thread = None
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            with session.lock:
+                session.close()
+        logger.info(f"SESSION_POOL_CLOSED sessions={len(sessions)}")
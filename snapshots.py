@@ -0,0 +1,165 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE_NAME = "index.json"
+
+
+class SnapshotIndex:
+    """
+    Index of the latest parsed configuration of every device, stored as index.json in the output folder.
+    Every entry holds the SHA-256 hash of the configuration and the file it was written to. A configuration with the
+    same hash as the latest one is not written again, only the time of the check is recorded in the index.
+    If the devices are probed before they are read (see ConfigReader), the output of the probe is stored as well.
+
+    Example entry:
+
+    "10.0.0.1:5000": {"sha256": "...", "file": "10.0.0.1_5000-..._config.txt", "status": "unchanged",
+                      "changed": "2026-01-01T00:00:00", "checked": "2026-01-02T00:00:00",
+                      "probe": "! Last configuration change at 10:00:00 UTC Mon Jan 1 2026"}
+    """
+
+    def __init__(self, output_dir: Path, force_write: bool = False) -> None:
+        """
+        :param output_dir: output folder containing the parsed configurations and the index
+        :param force_write: writes every configuration, even if it is unchanged, the index is still updated
+        """
+        self._output_dir = Path(output_dir)
+        self._force_write = force_write
+        self._path = self._output_dir / INDEX_FILE_NAME
+        self._lock = threading.Lock()
+        self.entries = {}
+        self.changed = 0
+        self.unchanged = 0
+
+    def __repr__(self) -> str:
+        return f"SnapshotIndex({self._path}, devices={len(self.entries)})"
+
+    def load(self) -> None:
+        """
+        Loads the index of the last run. A missing or broken index is treated as empty, so every configuration is
+        written again.
+        :return: None
+        """
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            if not isinstance(entries, dict):
+                raise TypeError(f"TYPE_ERROR: index must be of type dict. Current: {type(entries)}")
+            self.entries = entries
+        except FileNotFoundError:
+            self.entries = {}
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.warning(f"WARNING_SNAPSHOT_INDEX_INVALID path={self._path} error={e}")
+            self.entries = {}
+
+    def save(self) -> None:
+        """
+        Writes the index, the old index is only replaced once the new one is completely written
+        :return: None
+        """
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_name(self._path.name + ".tmp")
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self._path)
+        logger.info(f"SNAPSHOT_INDEX_SAVED path={self._path} changed={self.changed} unchanged={self.unchanged}")
+
+    def _current_entry(self, key: str) -> dict | None:
+        """
+        :return: the entry of the device, None if there is none or its configuration file does not exist anymore
+        """
+        entry = self.entries.get(key)
+        if entry is None or not (self._output_dir / entry.get("file", "")).is_file():
+            return None
+        return entry
+
+    def probe(self, ip: str, port) -> str | None:
+        """
+        :param ip: IP address of the device
+        :param port: port of the device
+        :return: probe output stored with the latest configuration of the device, None if there is none or every
+        configuration is written anyway
+        """
+        if self._force_write:
+            return None
+        with self._lock:
+            entry = self._current_entry(f"{ip}:{port}")
+            return None if entry is None else entry.get("probe")
+
+    def set_probe(self, ip: str, port, probe: str) -> None:
+        """
+        Stores the probe output of a device after its configuration was stored
+        :param ip: IP address of the device
+        :param port: port of the device
+        :param probe: output of the probe commands
+        """
+        with self._lock:
+            entry = self.entries.get(f"{ip}:{port}")
+            if entry is not None:
+                entry["probe"] = probe
+
+    def mark_unchanged(self, ip: str, port) -> None:
+        """
+        Records a check of a device whose configuration is known to be unchanged without parsing it
+        :param ip: IP address of the device
+        :param port: port of the device
+        """
+        with self._lock:
+            entry = self.entries.get(f"{ip}:{port}")
+            if entry is None:
+                return
+            entry["status"] = "unchanged"
+            entry["checked"] = datetime.now().isoformat(timespec="seconds")
+            self.unchanged += 1
+        logger.info(f"SNAPSHOT_UNCHANGED ip={ip} port={port} file={entry['file']}")
+
+    def store(self, ip: str, port, output_path: Path, config: str) -> bool:
+        """
+        Writes the configuration to output_path, unless the latest configuration of the device has the same hash and
+        its file still exists. In that case only the check is recorded.
+        :param ip: IP address of the device
+        :param port: port of the device
+        :param output_path: file the configuration is written to if it changed
+        :param config: the parsed configuration
+        :return: True if the configuration was written, False if it was unchanged
+        """
+        key = f"{ip}:{port}"
+        digest = hashlib.sha256(config.encode("utf-8")).hexdigest()
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            entry = self._current_entry(key)
+            if not self._force_write and entry is not None and entry.get("sha256") == digest:
+                entry["status"] = "unchanged"
+                entry["checked"] = now
+                self.unchanged += 1
+                logger.info(f"SNAPSHOT_UNCHANGED ip={ip} port={port} file={entry['file']}")
+                return False
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w") as f:
+            f.write(config)
+        with self._lock:
+            self.entries[key] = {
+                "sha256": digest,
+                "file": os.path.relpath(output_path, self._output_dir),
+                "status": "changed",
+                "changed": now,
+                "checked": now
+            }
+            self.changed += 1
+        return True
@@ -0,0 +1,211 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import asyncio
+
+# telnet protocol bytes (RFC 854)
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+OPTION_ECHO = 1
+OPTION_SUPPRESS_GO_AHEAD = 3
+OPTION_TERMINAL_TYPE = 24
+OPTION_WINDOW_SIZE = 31
+# what a Cisco console sends right after the connection is opened, including a subnegotiation
+GREETING = bytes([IAC, WILL, OPTION_ECHO, IAC, WILL, OPTION_SUPPRESS_GO_AHEAD, IAC, DO, OPTION_TERMINAL_TYPE,
+                  IAC, DO, OPTION_WINDOW_SIZE, IAC, SB, OPTION_TERMINAL_TYPE, 1, IAC, SE])
+PAGE_LINES = 24
+MORE = " --More-- "
+INVALID_INPUT = "        ^\n% Invalid input detected at '^' marker.\n\n"
+
+
+def running_config(interfaces: int = 60) -> str:
+    """
+    :param interfaces: number of interfaces, the default is longer than a page
+    :return: output of 'show running-config' of the fake device
+    """
+    lines = ["Building configuration...", "", "Current configuration : 4242 bytes", "!", "version 15.2",
+             "hostname R1", "!"]
+    for index in range(interfaces):
+        lines += [f"interface GigabitEthernet0/{index}", f" description port {index}", " no ip address", "!"]
+    lines += ["line con 0", " stopbits 1", "!", "end"]
+    return "\n".join(lines) + "\n"
+
+
+class FakeIOS:
+    """
+    Minimal Cisco IOS telnet console for the tests: negotiates telnet options, asks for username, password and enable
+    secret, pages long output until 'terminal length 0' is sent and knows the configuration modes. Every answer is
+    written in small chunks, so prompts and telnet commands are split over several reads of the client.
+    """
+
+    def __init__(self, hostname: str = "R1", username: str = "cisco", password: str = "cisco",
+                 secret: str = "class", chunk_size: int = 7) -> None:
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.secret = secret
+        self.chunk_size = chunk_size
+        self.outputs = {"show running-config": running_config(),
+                        "show ip interface brief": "Interface              IP-Address      OK? Method Status"
+                                                   "                Protocol\nGigabitEthernet0/0     unassigned"
+                                                   "      YES unset  up                    up      \n"}
+        # every command received in any session, the tests check which commands were sent
+        self.received = []
+        # telnet option answers received from the client, e.g. (DO, OPTION_ECHO)
+        self.negotiated = []
+        self._server = None
+
+    async def start(self) -> int:
+        """
+        :return: the port the server listens on at 127.0.0.1
+        """
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = _Session(self, reader, writer)
+        try:
+            await session.run()
+        except (EOFError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class _Session:
+    """
+    State of one connection to the fake device
+    """
+
+    def __init__(self, device: FakeIOS, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.device = device
+        self.reader = reader
+        self.writer = writer
+        self.mode = ">"
+        self.paging = True
+
+    async def write(self, text: str) -> None:
+        # a literal 0xFF is doubled, as the output may contain it
+        data = text.replace("\n", "\r\n").encode("utf-8").replace(b"\xff", b"\xff\xff")
+        for start in range(0, len(data), self.device.chunk_size):
+            self.writer.write(data[start:start + self.device.chunk_size])
+            await self.writer.drain()
+
+    async def read_byte(self) -> int:
+        data = await self.reader.read(1)
+        if not data:
+            raise EOFError
+        return data[0]
+
+    async def read_line(self) -> str:
+        """
+        :return: the next line sent by the client, the answers to the telnet options are recorded
+        """
+        line = bytearray()
+        while True:
+            byte = await self.read_byte()
+            if byte == IAC:
+                command = await self.read_byte()
+                if command == IAC:
+                    line.append(IAC)
+                elif command in (DO, DONT, WILL, WONT):
+                    self.device.negotiated.append((command, await self.read_byte()))
+                continue
+            if byte == ord("\r"):
+                continue
+            if byte == ord("\n"):
+                return line.decode("utf-8", errors="replace")
+            line.append(byte)
+
+    def prompt(self) -> str:
+        return self.device.hostname + self.mode
+
+    async def run(self) -> None:
+        self.writer.write(GREETING)
+        await self.read_line()
+        await self.write("\nUser Access Verification\n\n")
+        # like IOS, the login is asked for again after a wrong one, the connection is closed after three
+        for _ in range(3):
+            await self.write("Username: ")
+            username = await self.read_line()
+            await self.write("\nPassword: ")
+            password = await self.read_line()
+            if (username, password) == (self.device.username, self.device.password):
+                break
+            await self.write("\n% Login invalid\n\n")
+        else:
+            return
+        await self.write("\n" + self.prompt())
+        while True:
+            command = await self.read_line()
+            self.device.received.append(command)
+            # the console echoes every character it receives
+            await self.write(command + "\n")
+            await self.execute(command.strip())
+            await self.write(self.prompt())
+
+    async def execute(self, command: str) -> None:
+        if command == "" or command.startswith("!"):
+            return
+        if command == "enable" and self.mode == ">":
+            await self.write("Password: ")
+            if await self.read_line() == self.device.secret:
+                self.mode = "#"
+            else:
+                await self.write("\n% Bad secrets\n\n")
+            return
+        if command.startswith("terminal "):
+            if command == "terminal length 0":
+                self.paging = False
+            return
+        if self.mode == ">":
+            await self.write(INVALID_INPUT)
+            return
+        if command == "end":
+            self.mode = "#"
+            return
+        if command == "configure terminal":
+            if self.mode != "#":
+                await self.write(INVALID_INPUT)
+                return
+            await self.write("Enter configuration commands, one per line.  End with CNTL/Z.\n")
+            self.mode = "(config)#"
+            return
+        if self.mode != "#":
+            if command.startswith("interface "):
+                self.mode = "(config-if)#"
+            elif command == "exit":
+                self.mode = "(config)#" if self.mode != "(config)#" else "#"
+            return
+        if command in self.device.outputs:
+            await self.page(self.device.outputs[command])
+            return
+        await self.write(INVALID_INPUT)
+
+    async def page(self, output: str) -> None:
+        """
+        Writes the output, with paging a page at a time, the client has to press space for the next page
+        """
+        lines = output.split("\n")
+        while self.paging and len(lines) > PAGE_LINES:
+            await self.write("\n".join(lines[:PAGE_LINES]) + "\n" + MORE)
+            if await self.read_byte() != ord(" "):
+                await self.write("\n")
+                return
+            await self.write("\b" * len(MORE) + " " * len(MORE) + "\b" * len(MORE))
+            lines = lines[PAGE_LINES:]
+        await self.write("\n".join(lines))
@@ -0,0 +1,137 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import unittest
+from multiprocessing import AuthenticationError
+
+from async_connector import AsyncConnector
+from connector import ExecMode
+from tests.fake_ios import FakeIOS, running_config, DO, DONT, WONT, OPTION_ECHO, OPTION_SUPPRESS_GO_AHEAD, \
+    OPTION_TERMINAL_TYPE, OPTION_WINDOW_SIZE
+
+
+class AsyncConnectorTest(unittest.IsolatedAsyncioTestCase):
+    """
+    Runs the AsyncConnector against the fake IOS console in tests/fake_ios.py
+    """
+
+    async def asyncSetUp(self) -> None:
+        self.device = FakeIOS()
+        self.port = await self.device.start()
+        self.connection = None
+
+    async def asyncTearDown(self) -> None:
+        if self.connection is not None:
+            await self.connection.disconnect()
+        await self.device.stop()
+
+    async def connect(self, username: str = "cisco", password: str = "cisco", secret: str = "class") -> AsyncConnector:
+        self.connection = AsyncConnector("cisco_ios_telnet", "127.0.0.1", self.port, username, password, secret,
+                                         timeout=5)
+        await self.connection.connect()
+        return self.connection
+
+    async def test_login_and_telnet_negotiation(self):
+        connection = await self.connect()
+        self.assertEqual("R1>", await connection.find_prompt())
+        self.assertEqual(ExecMode.USER_EXEC, await connection.get_exec_mode())
+        # echo and suppress go ahead are accepted, every other option is refused
+        self.assertIn((DO, OPTION_ECHO), self.device.negotiated)
+        self.assertIn((DO, OPTION_SUPPRESS_GO_AHEAD), self.device.negotiated)
+        self.assertIn((WONT, OPTION_TERMINAL_TYPE), self.device.negotiated)
+        self.assertIn((WONT, OPTION_WINDOW_SIZE), self.device.negotiated)
+        self.assertNotIn((DONT, OPTION_ECHO), self.device.negotiated)
+
+    async def test_login_rejected(self):
+        with self.assertRaises(AuthenticationError):
+            await self.connect(password="wrong")
+
+    async def test_enable(self):
+        connection = await self.connect()
+        await connection.go_to_priv_exec_mode()
+        self.assertEqual("R1#", connection.prompt)
+        self.assertEqual(ExecMode.PRIVILEGED_EXEC, await connection.get_exec_mode())
+
+    async def test_enable_wrong_secret(self):
+        connection = await self.connect(secret="wrong")
+        with self.assertRaises(RuntimeError):
+            await connection.go_to_priv_exec_mode()
+
+    async def test_paged_show_command(self):
+        connection = await self.connect()
+        await connection.go_to_priv_exec_mode()
+        success, output = await connection.send_command_with_response("show running-config", read_timeout=5)
+        self.assertTrue(success)
+        # connect() turned paging off, so the output is complete and without a --More-- prompt
+        self.assertIn("terminal length 0", self.device.received)
+        self.assertNotIn("--More--", output)
+        self.assertEqual(running_config().strip(), output.strip())
+        self.assertEqual("R1#", connection.prompt)
+
+    async def test_prompt_split_into_single_bytes(self):
+        # every byte arrives on its own, the telnet commands and the prompt are split over many reads
+        self.device.chunk_size = 1
+        connection = await self.connect()
+        await connection.go_to_priv_exec_mode()
+        success, output = await connection.send_command_with_response("show ip interface brief", read_timeout=5)
+        self.assertTrue(success)
+        self.assertEqual(self.device.outputs["show ip interface brief"].strip(), output.strip())
+
+    async def test_output_longer_than_search_overlap(self):
+        self.device.outputs["show running-config"] = running_config(interfaces=2000)
+        self.device.chunk_size = 4096
+        connection = await self.connect()
+        await connection.go_to_priv_exec_mode()
+        success, output = await connection.send_command_with_response("show running-config", read_timeout=10)
+        self.assertTrue(success)
+        self.assertEqual(running_config(interfaces=2000).strip(), output.strip())
+
+    async def test_invalid_command(self):
+        connection = await self.connect()
+        await connection.go_to_priv_exec_mode()
+        self.assertEqual((False, "show bogus"), await connection.send_command_with_response("show bogus"))
+
+    async def test_show_batch(self):
+        connection = await self.connect()
+        await connection.go_to_priv_exec_mode()
+        responses = await connection.send_show_batch(["show running-config", "show ip interface brief"])
+        self.assertEqual([True, True], [success for success, _ in responses])
+        self.assertEqual(running_config().strip(), responses[0][1].strip())
+        self.assertEqual(self.device.outputs["show ip interface brief"].strip(), responses[1][1].strip())
+
+    async def test_config_mode(self):
+        connection = await self.connect()
+        await connection.go_to_glob_exec_mode()
+        self.assertEqual("R1(config)#", connection.prompt)
+        self.assertEqual(ExecMode.GLOBAL_EXEC, await connection.get_exec_mode())
+        await connection.send_command_with_response("interface GigabitEthernet0/1", expected_str=r"\(config[^\)]*\)#")
+        self.assertEqual("R1(config-if)#", connection.prompt)
+        await connection.go_to_priv_exec_mode()
+        self.assertEqual("R1#", connection.prompt)
+        self.assertEqual(ExecMode.PRIVILEGED_EXEC, await connection.get_exec_mode())
+
+    async def test_config_mode_is_not_entered_again(self):
+        connection = await self.connect()
+        await connection.go_to_glob_exec_mode()
+        sent = len(self.device.received)
+        await connection.go_to_glob_exec_mode()
+        # already in '(config)#', the same as with the netmiko transport nothing is sent
+        self.assertEqual(sent, len(self.device.received))
+        self.assertEqual("R1(config)#", connection.prompt)
+
+    async def test_config_sub_mode_is_left(self):
+        connection = await self.connect()
+        await connection.go_to_glob_exec_mode()
+        await connection.send_command_with_response("interface GigabitEthernet0/1", expected_str=r"\(config[^\)]*\)#")
+        await connection.go_to_glob_exec_mode()
+        self.assertEqual("R1(config)#", connection.prompt)
+        self.assertEqual(["end", "configure terminal"], self.device.received[-2:])
+
+
+if __name__ == '__main__':
+    unittest.main()
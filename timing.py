@@ -0,0 +1,165 @@
+#       _____________________________________________
+#      __/___  ____/\__/ ______ \____/ /\____/ /\___
+#     ___\__/ /\_\_\/_/ /_____/ /\__/_/_/___/_/\/__
+#    ______/ /\/_____/ ____  __/\/__\/_  __/\_\/__
+#   ______/ /\/_____/ /\__\\ \_\/____\/ /\_\/____
+#  ______/_/\/_____/_/\/___\\_\______/_/\/______
+# _______\_\/______\_\/_____|_|______\_\/______
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+TIMING_FILE_NAME = "timing.json"
+# weight of a new measurement in the moving averages
+SMOOTHING = 0.3
+# answers up to this size measure the round trip time, answers from this size on measure the output rate
+RTT_MAX_BYTES = 512
+RATE_MIN_BYTES = 4096
+# a timeout is the predicted duration times the safety factor plus the margin, limited to the bounds
+SAFETY_FACTOR = 3
+MARGIN_SECONDS = 2
+MIN_TIMEOUT = 5
+MAX_TIMEOUT = 300
+# the output of a command may have grown since it was measured, e.g. a longer running-config
+OUTPUT_GROWTH = 1.5
+# round trip time per unit of the netmiko global_delay_factor, devices faster than this keep the factor 1
+DELAY_FACTOR_RTT = 0.2
+MAX_DELAY_FACTOR = 4
+# only the commands reading the device are measured one by one, configuration lines only update the averages
+MEASURED_COMMANDS = ("show ",)
+
+
+def _average(old: float | None, new: float) -> float:
+    return new if old is None else old + SMOOTHING * (new - old)
+
+
+class TimingProfile:
+    """
+    Timing measured for one device: the round trip time, the rate the device sends its output with and the size and
+    duration of every read command. The timeouts of the commands are set from these measurements instead of fixed
+    values, so fast devices fail fast and slow devices get the time they need.
+    """
+
+    def __init__(self, data: dict = None) -> None:
+        """
+        :param data: profile as returned by to_dict(), None for a device without measurements
+        """
+        data = data or {}
+        self.rtt = data.get("rtt")
+        self.rate = data.get("rate")
+        self.commands = data.get("commands", {})
+        self.updated = data.get("updated")
+
+    def __repr__(self) -> str:
+        return f"TimingProfile(rtt={self.rtt}, rate={self.rate}, commands={len(self.commands)})"
+
+    def record(self, command: str, seconds: float, size: int) -> None:
+        """
+        Records the answer of a command
+        :param command: the answered command
+        :param seconds: time from sending the command until the answer was complete
+        :param size: size of the answer in characters
+        :return: None
+        """
+        if size <= RTT_MAX_BYTES:
+            self.rtt = _average(self.rtt, seconds)
+        elif size >= RATE_MIN_BYTES:
+            transfer = max(seconds - (self.rtt or 0), 0.01)
+            self.rate = _average(self.rate, size / transfer)
+        cmd = command.strip()
+        if cmd.startswith(MEASURED_COMMANDS):
+            self.commands[cmd] = {"bytes": size, "seconds": round(_average(
+                self.commands.get(cmd, {}).get("seconds"), seconds), 4)}
+        self.updated = datetime.now().isoformat(timespec="seconds")
+
+    def read_timeout(self, command: str, default: float) -> float:
+        """
+        :param command: command that is sent next
+        :param default: timeout used as long as the device or the command was not measured
+        :return: seconds to wait for the answer of the command
+        """
+        stats = self.commands.get(command.strip())
+        if stats is None:
+            # unknown commands keep the default, slow devices get more time
+            if self.rtt is None:
+                return default
+            return max(default, min(MAX_TIMEOUT, SAFETY_FACTOR * self.rtt + MARGIN_SECONDS))
+        predicted = stats["seconds"]
+        if self.rate is not None:
+            predicted = max(predicted, (self.rtt or 0) + stats["bytes"] * OUTPUT_GROWTH / self.rate)
+        return round(min(MAX_TIMEOUT, max(MIN_TIMEOUT, SAFETY_FACTOR * predicted + MARGIN_SECONDS)), 1)
+
+    def delay_factor(self) -> float:
+        """
+        :return: global delay factor of netmiko, 1 for fast devices, larger for devices with a long round trip time
+        """
+        if self.rtt is None:
+            return 1
+        return round(min(MAX_DELAY_FACTOR, max(1.0, self.rtt / DELAY_FACTOR_RTT)), 1)
+
+    def to_dict(self) -> dict:
+        # copied, the device may record a command while the profiles are saved
+        return {"rtt": self.rtt, "rate": self.rate, "commands": dict(self.commands), "updated": self.updated}
+
+
+class TimingStore:
+    """
+    Timing profiles of all devices, stored as timing.json in the output folder, so the measurements of one run are
+    used from the start of the next one.
+    """
+
+    def __init__(self, output_dir: Path) -> None:
+        """
+        :param output_dir: folder the timing file is stored in
+        """
+        self._output_dir = Path(output_dir)
+        self._path = self._output_dir / TIMING_FILE_NAME
+        self._lock = threading.Lock()
+        self._profiles = {}
+
+    def __repr__(self) -> str:
+        return f"TimingStore({self._path}, devices={len(self._profiles)})"
+
+    def load(self) -> None:
+        """
+        Loads the profiles of the last run, a missing or broken file is treated as empty
+        :return: None
+        """
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise TypeError(f"TYPE_ERROR: timing must be of type dict. Current: {type(data)}")
+            self._profiles = {key: TimingProfile(value) for key, value in data.items()}
+        except FileNotFoundError:
+            self._profiles = {}
+        except (json.JSONDecodeError, TypeError, AttributeError) as e:
+            logger.warning(f"WARNING_TIMING_INVALID path={self._path} error={e}")
+            self._profiles = {}
+
+    def profile(self, ip: str, port: str) -> TimingProfile:
+        """
+        :return: the profile of the device, a new one if the device was not measured yet
+        """
+        with self._lock:
+            return self._profiles.setdefault(f"{ip}:{port}", TimingProfile())
+
+    def save(self) -> None:
+        """
+        Writes the profiles, the old file is only replaced once the new one is completely written
+        :return: None
+        """
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_name(self._path.name + ".tmp")
+        with self._lock:
+            data = {key: profile.to_dict() for key, profile in self._profiles.items()}
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self._path)
+        logger.info(f"TIMING_SAVED path={self._path} devices={len(data)}")